@@ -282,29 +282,29 @@ impl AssemblyUnit<'_> {
 }
 
 
-/// Try to load an assembly unit
+/// Resolve the absolute path of an assembly unit
 /// 
-/// If successful, return the assembly code and the absolute path to the unit
-fn load_asm_unit(unit_name: &str, current_unit_path: &Path) -> io::Result<(PathBuf, AssemblyCode)> {
+/// The unit is not loaded, so that units that have already been included aren't read again
+fn resolve_asm_unit_path(unit_name: &str, current_unit_path: &Path) -> io::Result<PathBuf> {
 
     let unit_path = Path::new(unit_name);
 
     if unit_path.is_absolute() {
-        // The unit path is absolute, try to load it directly
-        return Ok((unit_path.to_path_buf(), files::load_assembly(unit_path)?));
+        // The unit path is absolute, use it directly
+        return Ok(unit_path.to_path_buf());
     }
 
     // The unit path is relative then
 
-    // Try to load the unit from the standard library
+    // Try to find the unit in the standard library
     {
         let unit_path = configs::INCLUDE_LIB_PATH.join(unit_path);
-        if let Ok(assembly) = files::load_assembly(&unit_path) {
-            return Ok((unit_path.canonicalize().unwrap(), assembly))
+        if unit_path.is_file() {
+            return unit_path.canonicalize();
         }
     }
 
-    // Finally, try to load the unit from the current assembly unit directory
+    // Finally, try to find the unit in the current assembly unit directory
 
     let parent_dir = match current_unit_path.parent() {
         Some(parent_dir) => parent_dir,
@@ -319,11 +319,7 @@ fn load_asm_unit(unit_name: &str, current_unit_path: &Path) -> io::Result<(PathB
     };  
 
     // Get the absolute path of the include unit
-    let unit_path = parent_dir.join(unit_name).canonicalize()?;
-
-    let assembly = files::load_assembly(&unit_path)?;
-
-    Ok((unit_path, assembly))
+    parent_dir.join(unit_name).canonicalize()
 }
 
 
@@ -472,18 +468,6 @@ fn evaluate_special_symbols(line: &str, current_binary_address: Address, line_nu
 /// Assemble recursively an assembly unit and its dependencies
 fn assemble_unit(asm_unit: AssemblyUnit, verbose: bool, program_info: &mut ProgramInfo) {
 
-    // Check if the assembly unit has already been included
-    if let Some((exported_labels, exported_macros, exported_const_macros)) = program_info.included_units.get(asm_unit.path) {
-        if verbose {
-            println!("Unit already included: {}", asm_unit.path.display());
-            println!("Exported labels: {:?}\n", exported_labels.keys());
-            println!("Exported macros: {:?}\n", exported_macros.keys());
-            println!("Exported const macros: {:?}\n", exported_const_macros.keys());
-        }
-
-        program_info.included_units.insert(asm_unit.path.to_path_buf(), (exported_labels.clone(), exported_macros.clone(), exported_const_macros.clone()));
-        return;
-    }
     // Insert a temporary entry in the included units map to avoid infinite recursive unit inclusion
     program_info.included_units.insert(asm_unit.path.to_path_buf(), (LabelMap::new(), MacroMap::new(), ConstMacroMap::new()));
 
@@ -666,16 +650,31 @@ fn parse_line(trimmed_line: &str, macro_info: &mut MacroInfo, asm_unit: &Assembl
                 }
             };
 
-            let (include_path, include_asm) = match load_asm_unit(include_unit_raw, asm_unit.path) {
-                Ok(x) => x,
+            let include_path = match resolve_asm_unit_path(include_unit_raw, asm_unit.path) {
+                Ok(include_path) => include_path,
                 Err(error) => error::include_error(asm_unit.path, &error, include_unit_raw, line_number, line)
             };
 
-            let new_asm_unit = AssemblyUnit::new(&include_path, include_asm, false);
+            // Units are loaded and assembled only the first time they're included
+            if let Some((exported_labels, exported_macros, exported_const_macros)) = program_info.included_units.get(&include_path) {
+                if verbose {
+                    println!("Unit already included: {}", include_path.display());
+                    println!("Exported labels: {:?}\n", exported_labels.keys());
+                    println!("Exported macros: {:?}\n", exported_macros.keys());
+                    println!("Exported const macros: {:?}\n", exported_const_macros.keys());
+                }
+            } else {
+                let include_asm = match files::load_assembly(&include_path) {
+                    Ok(include_asm) => include_asm,
+                    Err(error) => error::include_error(asm_unit.path, &error, include_unit_raw, line_number, line)
+                };
+
+                let new_asm_unit = AssemblyUnit::new(&include_path, include_asm, false);
+
+                // Assemble the included assembly unit
+                assemble_unit(new_asm_unit, verbose, program_info);
+            }
 
-            // Assemble the included assembly unit
-            assemble_unit(new_asm_unit, verbose, program_info);
-                
             let (exported_labels, exported_macros, exported_const_macros): &(LabelMap, MacroMap, ConstMacroMap) = program_info.included_units.get(&include_path).unwrap_or_else(
                 || panic!("Internal assembler error: included unit not found in included units map. This is a bug.")
             );
@@ -967,15 +966,19 @@ fn parse_line(trimmed_line: &str, macro_info: &mut MacroInfo, asm_unit: &Assembl
                 }
 
                 // Replace the macro argument placeholders in the macro body with the macro call arguments
-                let mut mlines: Vec<String> = def.body.clone();
-                for mline in mlines.iter_mut() {
-                
-                    // Not very efficient, but works
-                    for (i, arg) in def.args.iter().enumerate() {
-                        *mline = mline.replace(format!("{{{}}}", arg).as_str(), macro_args[i]);
+                // The placeholders are formatted once per call, and only lines that contain one are rewritten
+                let placeholders: Vec<String> = def.args.iter().map(|arg| format!("{{{}}}", arg)).collect();
+                let mlines: Vec<String> = def.body.iter().map(|mline| {
+
+                    let mut mline = mline.clone();
+                    for (placeholder, arg) in placeholders.iter().zip(&macro_args) {
+                        if mline.contains(placeholder.as_str()) {
+                            mline = mline.replace(placeholder.as_str(), arg);
+                        }
                     }
+                    mline
 
-                }
+                }).collect();
 
                 // Parse the macro body
                 for mline in mlines {
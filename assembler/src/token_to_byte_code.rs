@@ -34,16 +34,19 @@ fn number_size(number: i64) -> usize {
         std::cmp::Ordering::Equal => 1,
         std::cmp::Ordering::Less => 8,
         std::cmp::Ordering::Greater => {
-            number.to_le_bytes().iter().rev().skip_while(|&&b| b == 0).count()
+            (i64::BITS - number.leading_zeros()).div_ceil(8) as usize
         }
     }
 }
 
 
 /// Try to fit the given number into the given number of bytes.
-fn fit_into_bytes(number: i64, size: u8) -> Option<ByteCode> {
+/// 
+/// Return the little endian representation of the number, of which only the first `size` bytes are to be used.
+/// The representation is returned by value so that encoding a constant doesn't allocate.
+fn fit_into_bytes(number: i64, size: u8) -> Option<[u8; mem::size_of::<i64>()]> {
     if number_size(number) <= size as usize {
-        Some(number.to_le_bytes()[..size as usize].to_vec())
+        Some(number.to_le_bytes())
     } else {
         None
     }
@@ -79,7 +82,7 @@ pub fn generate_operand_bytecode(instruction: ByteCodes, mut operands: Vec<Token
                     let repr = fit_into_bytes(*value, handled_size).unwrap_or_else(
                         || error::number_out_of_range::<u64>(unit_path, value.to_string().as_str(), 10, handled_size, line_number, line)
                     );
-                    $bytes.extend(repr);
+                    $bytes.extend_from_slice(&repr[..handled_size as usize]);
                 },
                 TokenValue::Label(label) => {
                     label_registry.add_reference(mem::take(label), last_byte_code + $bytes.len(), line_number);
@@ -619,7 +622,7 @@ pub fn generate_operand_bytecode(instruction: ByteCodes, mut operands: Vec<Token
                     let repr = fit_into_bytes(*value, 1).unwrap_or_else(
                         || error::number_out_of_range::<u64>(unit_path, value.to_string().as_str(), 10, 1, line_number, line)
                     );
-                    bytes.extend(repr);
+                    bytes.push(repr[0]);
                 },
                 _ => unreachable!()
             }
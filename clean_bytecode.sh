@@ -1,5 +1,5 @@
 #!/bin/bash
 # Remove all .bc files in the current directory and subdirectories.
 
-find . -name "*.bc" -exec rm {} \;
+find . -name "*.bc" -type f -delete
 
@@ -1,2 +1,2 @@
 #!/bin/bash
-cargo run --manifest-path disassembler/Cargo.toml $@
+exec cargo run --manifest-path disassembler/Cargo.toml "$@"
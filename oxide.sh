@@ -1,2 +1,2 @@
 #!/bin/bash
-cargo run --manifest-path oxide/Cargo.toml $@
+exec cargo run --manifest-path oxide/Cargo.toml "$@"
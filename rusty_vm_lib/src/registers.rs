@@ -11,6 +11,7 @@ macro_rules! declare_registers {
 
 #[allow(dead_code, non_camel_case_types)]
 #[derive(Clone, Copy, Debug)]
+#[repr(u8)]
 pub enum Registers {
     $(
         $name,
@@ -13,6 +13,7 @@ macro_rules! declare_errors {
     ($($name:ident),+) => {
 
 #[derive(Clone, Copy, Debug)]
+#[repr(u8)]
 pub enum ErrorCodes {
 
     $($name),+
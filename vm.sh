@@ -1,2 +1,2 @@
 #!/bin/bash
-cargo run --manifest-path vm/Cargo.toml $@
+exec cargo run --manifest-path vm/Cargo.toml "$@"
@@ -64,6 +64,22 @@ impl Memory {
         &mut self.memory[address..address + size]
     }
 
+
+    /// Get the `N` bytes at the given address as a fixed-size array.
+    /// Used to read fixed-width integers with `from_le_bytes` without going through a dynamically-sized slice.
+    #[inline(always)]
+    pub fn get_array<const N: usize>(&self, address: Address) -> [Byte; N] {
+        *self.memory[address..].first_chunk::<N>().unwrap()
+    }
+
+
+    /// Write the fixed-size array at the given address.
+    /// Used to store fixed-width integers produced by `to_le_bytes`.
+    #[inline(always)]
+    pub fn set_array<const N: usize>(&mut self, address: Address, data: [Byte; N]) {
+        *self.memory[address..].first_chunk_mut::<N>().unwrap() = data;
+    }
+
 }
 
 
@@ -105,7 +121,25 @@ mod tests {
         memory.memory = vec![0, 1, 2, 3, 4, 5, 6, 7].into_boxed_slice();
         memory.memcpy(0, 2, 4);
         assert_eq!(memory.memory, vec![0, 1, 0, 1, 2, 3, 6, 7].into_boxed_slice());
-    }    
+    }
+
+
+    #[test]
+    fn test_array_read_write() {
+        let mut memory = Memory::new(8);
+        memory.set_array(2, 0x0102_u16.to_le_bytes());
+        assert_eq!(memory.memory, vec![0, 0, 2, 1, 0, 0, 0, 0].into_boxed_slice());
+        assert_eq!(u16::from_le_bytes(memory.get_array(2)), 0x0102);
+        assert_eq!(u32::from_le_bytes(memory.get_array(1)), 0x0001_0200);
+    }
+
+
+    #[test]
+    #[should_panic]
+    fn test_array_read_out_of_bounds() {
+        let memory = Memory::new(8);
+        memory.get_array::<4>(6);
+    }
 
 }
 
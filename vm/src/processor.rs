@@ -3,12 +3,13 @@
 
 use std::io::{Read, Write};
 use std::io;
+use std::mem;
 use std::path::PathBuf;
 use std::time::{SystemTime, UNIX_EPOCH};
 use rand::Rng;
 
-use rusty_vm_lib::registers::Registers;
-use rusty_vm_lib::byte_code::ByteCodes;
+use rusty_vm_lib::registers::{Registers, REGISTER_COUNT};
+use rusty_vm_lib::byte_code::{is_jump_instruction, ByteCodes, BYTE_CODE_COUNT};
 use rusty_vm_lib::vm::{Address, ADDRESS_SIZE, ErrorCodes};
 use rusty_vm_lib::interrupts::Interrupts;
 
@@ -22,6 +23,207 @@ use crate::storage::Storage;
 use crate::terminal::Terminal;
 
 
+/// Expand `$body` once for every integer size an instruction can handle, with `$int` bound to the unsigned integer type of that size.
+/// 
+/// Each expansion is specialized for its size at compile time, instead of handling the size inside a generic body at runtime.
+macro_rules! match_int_size {
+    ($size:expr, $int:ident => $body:expr, _ => $invalid:expr) => {
+        match $size {
+            1 => { type $int = u8; $body },
+            2 => { type $int = u16; $body },
+            4 => { type $int = u32; $body },
+            8 => { type $int = u64; $body },
+            _ => $invalid,
+        }
+    };
+}
+
+
+/// Generate the handlers of the sized compare instructions from their operand kinds.
+/// 
+/// Every handler reads the operand size, fetches both operands through the `get_next_<kind>_operand` method of
+/// their kind and compares them.
+macro_rules! compare_handlers {
+    ($($(#[$attr:meta])* $name:ident: $left:tt, $right:tt;)+) => {
+        $(
+            $(#[$attr])*
+            fn $name(&mut self) {
+                let size = self.get_next_byte();
+
+                let left_value = operand!(self, $left, size);
+                let right_value = operand!(self, $right, size);
+
+                self.compare(left_value, right_value);
+            }
+        )+
+    };
+}
+
+
+/// Fetch the next `$size`-sized operand of the given kind
+macro_rules! operand {
+    ($self:ident, reg, $size:ident) => { $self.get_next_reg_operand($size) };
+    ($self:ident, addr_in_reg, $size:ident) => { $self.get_next_addr_in_reg_operand($size) };
+    ($self:ident, const, $size:ident) => { $self.get_next_const_operand($size) };
+    ($self:ident, addr_literal, $size:ident) => { $self.get_next_addr_literal_operand($size) };
+}
+
+
+/// Generate the handlers of the sized memory-to-memory move instructions from their operand kinds.
+/// 
+/// Every handler reads the operand size, fetches the destination and source addresses through `operand_address!`
+/// and copies the bytes.
+macro_rules! memory_move_handlers {
+    ($($(#[$attr:meta])* $name:ident: $dest:tt, $src:tt;)+) => {
+        $(
+            $(#[$attr])*
+            fn $name(&mut self) {
+                let size = self.get_next_byte();
+
+                let dest_address = operand_address!(self, $dest, size);
+                let src_address = operand_address!(self, $src, size);
+
+                self.memory.memcpy(src_address, dest_address, size as usize);
+            }
+        )+
+    };
+}
+
+
+/// Fetch the next operand of the given kind and return the address of its `$size` bytes of data.
+/// Constants are read in place from the bytecode, so their address is the pc, which is then moved past them.
+macro_rules! operand_address {
+    ($self:ident, addr_in_reg, $size:ident) => {{
+        let address_reg = $self.get_next_register();
+        $self.registers.get(address_reg) as Address
+    }};
+    ($self:ident, const, $size:ident) => {{
+        let address = $self.registers.pc();
+        $self.registers.inc_pc($size as usize);
+        address
+    }};
+    ($self:ident, addr_literal, $size:ident) => { $self.get_next_address() };
+}
+
+
+/// Signature of the functions that execute an instruction
+type InstructionHandler = fn(&mut Processor);
+
+
+/// An instruction whose opcode and operands have already been read from the bytecode
+#[derive(Clone, Copy)]
+struct DecodedInstruction {
+
+    operation: DecodedOperation,
+    /// The address right after the decoded part of the instruction
+    next_pc: Address,
+
+}
+
+// Decoded blocks are scanned linearly on every execution, so keep each entry to half a cache line.
+// Operations carry at most two 8-byte operands plus a few bytes of small ones.
+const _: () = assert!(mem::size_of::<DecodedInstruction>() == 32);
+
+
+impl DecodedInstruction {
+
+    /// Fuse this instruction with the one right after it, if they copy contiguous regions of memory that the combined copy
+    /// doesn't make overlap. Since the regions don't overlap, a single copy behaves just like the two copies in sequence.
+    fn fuse_memory_copies(&self, next: &DecodedInstruction) -> Option<DecodedInstruction> {
+
+        let (
+            DecodedOperation::MemoryCopy { src_address, dest_address, size },
+            DecodedOperation::MemoryCopy { src_address: next_src_address, dest_address: next_dest_address, size: next_size }
+        ) = (self.operation, next.operation) else {
+            return None;
+        };
+
+        let (size, next_size) = (size as usize, next_size as usize);
+
+        if src_address.checked_add(size) != Some(next_src_address) || dest_address.checked_add(size) != Some(next_dest_address) {
+            return None;
+        }
+
+        let size = size + next_size;
+        let src_end = src_address.checked_add(size)?;
+        let dest_end = dest_address.checked_add(size)?;
+
+        if src_address < dest_end && dest_address < src_end {
+            return None;
+        }
+
+        Some(DecodedInstruction {
+            operation: DecodedOperation::MemoryCopy { src_address, dest_address, size: u32::try_from(size).ok()? },
+            next_pc: next.next_pc,
+        })
+    }
+
+
+    /// Fuse this instruction with the conditional jump right after it, if this instruction sets the flags the jump tests.
+    /// The pair is then executed as a single super-instruction. Compares of the pc are never decoded and inc/dec of the pc end
+    /// their block, so the fused instructions don't read the pc and moving it past the jump first doesn't change their result.
+    fn fuse_conditional_jump(&self, next: &DecodedInstruction) -> Option<DecodedInstruction> {
+
+        let DecodedOperation::ConditionalJump { jump, jump_address } = next.operation else {
+            return None;
+        };
+
+        let operation = match self.operation {
+            DecodedOperation::IncReg(reg) => DecodedOperation::IncRegAndJump { reg, jump, jump_address },
+            DecodedOperation::DecReg(reg) => DecodedOperation::DecRegAndJump { reg, jump, jump_address },
+            DecodedOperation::CompareRegReg { left_reg, right_reg } => DecodedOperation::CompareRegRegAndJump { left_reg, right_reg, jump, jump_address },
+            DecodedOperation::CompareRegConst { left_reg, right_value } => DecodedOperation::CompareRegConstAndJump { left_reg, right_value, jump, jump_address },
+            _ => return None
+        };
+
+        Some(DecodedInstruction {
+            operation,
+            next_pc: next.next_pc,
+        })
+    }
+
+}
+
+
+/// The operation performed by a decoded instruction, together with its decoded operands.
+/// 
+/// Only the most frequently executed instructions have a specialized variant.
+#[derive(Clone, Copy)]
+enum DecodedOperation {
+
+    /// Execute the generic handler of the instruction, which reads the operands from the bytecode by itself
+    Generic(InstructionHandler),
+    /// Do nothing. A no-op followed by another instruction in its block is elided, since that instruction moves the pc past both
+    NoOperation,
+    /// Hot operand-less arithmetic, run inline instead of through the handler table
+    IntegerAdd,
+    IntegerSub,
+    IntegerMul,
+    MoveIntoRegFromReg { dest_reg: Registers, src_reg: Registers },
+    MoveIntoRegFromConst { dest_reg: Registers, value: u64 },
+    MoveIntoRegFromAddrLiteral { size: Byte, dest_reg: Registers, src_address: Address },
+    MoveIntoAddrLiteralFromReg { size: Byte, dest_address: Address, src_reg: Registers },
+    MoveIntoAddrLiteralFromConst { size: Byte, dest_address: Address, value: u64 },
+    /// Copy between two address literals. Consecutive copies of contiguous regions get fused into a single one
+    MemoryCopy { src_address: Address, dest_address: Address, size: u32 },
+    IncReg(Registers),
+    IncAddrLiteral { size: Byte, address: Address },
+    DecReg(Registers),
+    DecAddrLiteral { size: Byte, address: Address },
+    CompareRegReg { left_reg: Registers, right_reg: Registers },
+    CompareRegConst { left_reg: Registers, right_value: u64 },
+    Jump(Address),
+    ConditionalJump { jump: ByteCodes, jump_address: Address },
+    /// Flag-setting instructions fused with the conditional jump that follows them
+    IncRegAndJump { reg: Registers, jump: ByteCodes, jump_address: Address },
+    DecRegAndJump { reg: Registers, jump: ByteCodes, jump_address: Address },
+    CompareRegRegAndJump { left_reg: Registers, right_reg: Registers, jump: ByteCodes, jump_address: Address },
+    CompareRegConstAndJump { left_reg: Registers, right_value: u64, jump: ByteCodes, jump_address: Address },
+    Call(Address),
+
+}
+
+
 /// Return whether the most significant bit of the given value is set
 #[inline(always)]
 fn is_msb_set(value: u64) -> bool {
@@ -29,15 +231,12 @@ fn is_msb_set(value: u64) -> bool {
 }
 
 
-/// Converts a byte array to an integer
-fn bytes_to_int(bytes: &[Byte], handled_size: Byte) -> u64 {
-    match handled_size {
-        1 => bytes[0] as u64,
-        2 => u16::from_le_bytes(bytes.try_into().unwrap()) as u64,
-        4 => u32::from_le_bytes(bytes.try_into().unwrap()) as u64,
-        8 => u64::from_le_bytes(bytes.try_into().unwrap()),
-        _ => error::error(format!("Invalid number size: {}", handled_size).as_str()),
-    }
+/// Flush the output of the print interrupts.
+/// 
+/// Printing doesn't flush stdout by itself, so that programs printing in a loop don't pay a write syscall per print.
+/// Pending output is flushed at newlines, before the VM blocks or hands the terminal to another module, and at exit.
+fn flush_stdout() {
+    io::stdout().flush().expect("Failed to flush stdout");
 }
 
 
@@ -114,8 +313,9 @@ impl Processor {
     }
 
 
-    /// Execute the given bytecode
-    pub fn execute(&mut self, byte_code: &[Byte], mode: ExecutionMode) {
+    /// Execute the given bytecode.
+    /// The program terminates the process when it exits, so this never returns.
+    pub fn execute(&mut self, byte_code: &[Byte], mode: ExecutionMode) -> ! {
 
         // Set the program counter to the start of the program
 
@@ -136,7 +336,7 @@ impl Processor {
 
         // Execute the program
         match mode {
-            ExecutionMode::Normal => self.run(),
+            ExecutionMode::Normal => self.run(byte_code.len() - ADDRESS_SIZE),
             ExecutionMode::Verbose => self.run_verbose(),
             ExecutionMode::Interactive => self.run_interactive(byte_code.len()),
         }
@@ -145,16 +345,12 @@ impl Processor {
 
 
     /// Return the length of a null-terminated string
+    /// 
+    /// The terminator is searched for with a single scan over the raw memory slice instead of fetching one byte at a time.
     fn strlen(&self, address: Address) -> usize {
-        let mut length = 0;
-        let mut byte = self.memory.get_byte(address);
-
-        while byte != 0 {
-            length += 1;
-            byte = self.memory.get_byte(address + length);
-        }
-
-        length
+        self.memory.get_raw()[address..].iter().position(|&byte| byte == 0).unwrap_or_else(
+            || error::error(format!("String at address {:#X} is not null-terminated", address).as_str())
+        )
     }
 
 
@@ -169,14 +365,24 @@ impl Processor {
 
 
     /// If the stack has overflowed, set the error register and terminate the program (stack overflow is unrecoverable)
+    #[inline(always)]
     fn check_stack_overflow(&mut self) {
         if (self.registers.get(Registers::STACK_TOP_POINTER) as usize) > self.memory.get_stack_base() {
-            self.registers.set_error(ErrorCodes::StackOverflow);
-            self.handle_instruction(ByteCodes::EXIT);
+            self.stack_overflow();
         }
     }
 
 
+    /// Terminate the program because of a stack overflow.
+    /// Kept out of line so that the stack checks inlined into the handlers stay small.
+    #[cold]
+    #[inline(never)]
+    fn stack_overflow(&mut self) -> ! {
+        self.registers.set_error(ErrorCodes::StackOverflow);
+        self.exit();
+    }
+
+
     /// Pop the stack pointer backwards
     /// Increment the stack top pointer
     fn pop_stack_pointer(&mut self, offset: usize) {
@@ -189,190 +395,75 @@ impl Processor {
     /// Get the next address in the bytecode
     #[inline(always)]
     fn get_next_address(&mut self) -> Address {
-        let pc = self.registers.pc();
-        self.registers.inc_pc(ADDRESS_SIZE);
-        bytes_as_address(self.memory.get_bytes(pc, ADDRESS_SIZE))
+        Address::from_le_bytes(self.get_next_array::<ADDRESS_SIZE>())
     }
 
 
     /// Increment the `size`-sized value at the given address
     fn increment_bytes(&mut self, address: Address, size: Byte) {
-        let bytes = self.memory.get_bytes_mut(address, size as usize);
-
-        let (result, carry) = match size {
-
-            1 => {
-                let value = bytes[0];
-                let (res, carry) = {
-                    if let Some(res) = value.checked_add(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_add(1), true)
-                    }
-                };
-                bytes[0] = res;
-
-                (res as u64, carry)
-            },
-
-            2 => {
-                let value = u16::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_add(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_add(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
-                (res as u64, carry)
-            },
-
-            4 => {
-                let value = u32::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_add(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_add(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
+        let (result, carry) = match_int_size!(size,
+            Int => {
+                let (res, carry) = Int::from_le_bytes(self.memory.get_array(address)).overflowing_add(1);
+                self.memory.set_array(address, res.to_le_bytes());
                 (res as u64, carry)
             },
-
-            8 => {
-                let value = u64::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_add(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_add(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
-                (res, carry)
-            },
-
-            _ => error::error(format!("Invalid size for incrementing bytes: {}.", size).as_str()),
-        };
-
-        self.set_arithmetical_flags(
-            result == 0,
-            is_msb_set(result),
-            0,
-            carry,
-            carry ^ is_msb_set(result)
+            _ => error::error(format!("Invalid size for incrementing bytes: {}.", size).as_str())
         );
+
+        // Like the sign flag, the overflow flag reads the result as a 64-bit value
+        self.set_integer_flags(result, carry, result == i64::MIN as u64);
     }
     
     
     /// Decrement the `size`-sized value at the given address
     fn decrement_bytes(&mut self, address: Address, size: Byte) {
-        let bytes = self.memory.get_bytes_mut(address, size as usize);
-
-        let (result, carry) = match size {
-
-            1 => {
-                let value = bytes[0];
-                let (res, carry) = {
-                    if let Some(res) = value.checked_sub(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_sub(1), true)
-                    }
-                };
-                bytes[0] = res;
-
-                (res as u64, carry)
-            },
-
-            2 => {
-                let value = u16::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_sub(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_sub(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
-                (res as u64, carry)
-            },
-
-            4 => {
-                let value = u32::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_sub(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_sub(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
+        let (result, carry) = match_int_size!(size,
+            Int => {
+                let (res, carry) = Int::from_le_bytes(self.memory.get_array(address)).overflowing_sub(1);
+                self.memory.set_array(address, res.to_le_bytes());
                 (res as u64, carry)
             },
-
-            8 => {
-                let value = u64::from_le_bytes(bytes.try_into().unwrap());
-                let (res, carry) = {
-                    if let Some(res) = value.checked_sub(1) {
-                        (res, false)
-                    } else {
-                        (value.wrapping_sub(1), true)
-                    }
-                };
-                bytes.copy_from_slice(&res.to_le_bytes());
-
-                (res, carry)
-            },
-
-            _ => error::error(format!("Invalid size for decrementing bytes: {}.", size).as_str()),
-        };
-
-        self.set_arithmetical_flags(
-            result == 0,
-            is_msb_set(result),
-            0,
-            carry,
-            carry ^ is_msb_set(result)
+            _ => error::error(format!("Invalid size for decrementing bytes: {}.", size).as_str())
         );
+
+        // Like the sign flag, the overflow flag reads the result as a 64-bit value
+        self.set_integer_flags(result, carry, result == i64::MAX as u64);
     }
 
 
     /// Mobe a number of bytes from the given address into the given register
     fn move_bytes_into_register(&mut self, src_address: Address, dest_reg: Registers, handled_size: Byte) {
-        let bytes = self.memory.get_bytes(src_address, handled_size as usize);
         self.registers.set(
             dest_reg,
-            bytes_to_int(bytes, handled_size)
+            self.read_int(src_address, handled_size)
         );
     }
 
 
-    /// Jump (set the pc) to the given address
+    /// Read the `size`-sized integer at the given address
     #[inline(always)]
-    fn jump_to(&mut self, address: Address) {
-        self.registers.set(Registers::PROGRAM_COUNTER, address as u64);
+    fn read_int(&self, address: Address, size: Byte) -> u64 {
+        match_int_size!(size,
+            Int => Int::from_le_bytes(self.memory.get_array(address)) as u64,
+            _ => error::error(format!("Invalid number size: {}", size).as_str())
+        )
     }
 
 
-    /// Copy the bytes onto the stack
-    fn push_stack_bytes(&mut self, bytes: &[Byte]) {
+    /// Write the lowest `size` bytes of the given value at the given address
+    #[inline(always)]
+    fn write_int(&mut self, address: Address, value: u64, size: Byte) {
+        match_int_size!(size,
+            Int => self.memory.set_array(address, (value as Int).to_le_bytes()),
+            _ => error::error(format!("Invalid number size: {}", size).as_str())
+        );
+    }
 
-        // Push the stack pointer first so that it points to where the bytes will be inserted
-        self.push_stack_pointer(bytes.len());
 
-        // Copy the bytes onto the stack
-        self.memory.set_bytes(
-            self.registers.stack_top(),
-            bytes,
-        );
+    /// Jump (set the pc) to the given address
+    #[inline(always)]
+    fn jump_to(&mut self, address: Address) {
+        self.registers.set(Registers::PROGRAM_COUNTER, address as u64);
     }
 
 
@@ -389,46 +480,32 @@ impl Processor {
 
     /// Push an 8-byte value onto the stack
     fn push_stack(&mut self, value: u64) {
-        self.push_stack_bytes(&value.to_le_bytes());
+
+        // Push the stack pointer first so that it points to where the value will be written
+        self.push_stack_pointer(8);
+
+        self.memory.set_array(self.registers.stack_top(), value.to_le_bytes());
     }
 
 
-    /// Pop `size` bytes from the stack
-    fn pop_stack_bytes(&mut self, size: usize) -> &[Byte] {
+    /// Pop a `size`-sized integer from the stack
+    fn pop_stack(&mut self, size: Byte) -> u64 {
 
-        self.pop_stack_pointer(size);
+        self.pop_stack_pointer(size as usize);
 
         // Subtract the size from the stack top pointer to get the address of the previous top of the stack
-        self.memory.get_bytes(
-            self.registers.stack_top() - size,
-            size,
-        )
+        self.read_int(self.registers.stack_top() - size as usize, size)
     }
 
 
     /// Move a number of bytes from the given register into the given address
     fn move_from_register_into_address(&mut self, src_reg: Registers, dest_address: Address, handled_size: Byte) {
-        let value = self.registers.get(src_reg);
-
-        match handled_size {
-            1 => self.memory.set_bytes(dest_address, &(value as u8).to_le_bytes()),
-            2 => self.memory.set_bytes(dest_address, &(value as u16).to_le_bytes()),
-            4 => self.memory.set_bytes(dest_address, &(value as u32).to_le_bytes()),
-            8 => self.memory.set_bytes(dest_address, &value.to_le_bytes()),
-            _ => error::error(format!("Invalid size for move instruction {}.", handled_size).as_str()),
-        }
+        self.write_int(dest_address, self.registers.get(src_reg), handled_size);
     }
         
     
-    /// Get the next `size` bytes in the bytecode
-    fn get_next_bytes(&mut self, size: usize) -> &[Byte] {
-        let pc = self.registers.pc();
-        self.registers.inc_pc(size);
-        self.memory.get_bytes(pc, size)
-    }
-
-
     /// Get the next byte in the bytecode
+    #[inline(always)]
     fn get_next_byte(&mut self) -> Byte {
         let pc = self.registers.pc();
         self.registers.inc_pc(1);
@@ -436,1185 +513,1486 @@ impl Processor {
     }
 
 
-    fn run(&mut self) {
-        loop {
-            let opcode = ByteCodes::from(self.get_next_byte());
-            self.handle_instruction(opcode);
-        }
+    /// Get the next `N` bytes in the bytecode as a fixed-size array.
+    /// Handlers use this to fetch their whole fixed-size operand block with a single pc read and update.
+    #[inline(always)]
+    fn get_next_array<const N: usize>(&mut self) -> [Byte; N] {
+        let pc = self.registers.pc();
+        self.registers.inc_pc(N);
+        self.memory.get_array(pc)
     }
 
 
-    fn run_interactive(&mut self, byte_code_size: usize) {
-
-        println!("Running VM in interactive mode");
-        println!("Byte code size is {} bytes", byte_code_size);
-        println!("Start address is: {:#X}", self.registers.pc());
-        println!();
+    /// Get the next register operand in the bytecode
+    #[inline(always)]
+    fn get_next_register(&mut self) -> Registers {
+        Registers::from(self.get_next_byte())
+    }
 
-        loop {
 
-            let previous_args = self.memory.get_bytes(
-                self.interactive_last_instruction_pc,
-                self.registers.pc().saturating_sub(self.interactive_last_instruction_pc)
-            );
-            println!("Previous args: {:?}", previous_args);
+    /// Get the value of the next register operand in the bytecode.
+    /// Register values are always used whole, so the operand size is ignored.
+    #[inline(always)]
+    fn get_next_reg_operand(&mut self, _size: Byte) -> u64 {
+        let reg = self.get_next_register();
+        self.registers.get(reg)
+    }
 
-            let opcode = ByteCodes::from(self.get_next_byte());
 
-            self.interactive_last_instruction_pc = self.registers.pc();
+    /// Get the `size`-sized value at the address stored in the next register operand in the bytecode
+    #[inline(always)]
+    fn get_next_addr_in_reg_operand(&mut self, size: Byte) -> u64 {
+        let address_reg = self.get_next_register();
+        let address = self.registers.get(address_reg) as Address;
+        self.read_int(address, size)
+    }
 
-            println!();
 
-            println!("PC: {}, opcode: {}", self.registers.pc(), opcode);
-            println!("Registers: {}", self.display_registers());
+    /// Get the next `size`-sized constant operand in the bytecode.
+    /// The constant is decoded in place with a fixed-width read for its size, without slicing the bytecode.
+    #[inline(always)]
+    fn get_next_const_operand(&mut self, size: Byte) -> u64 {
+        let pc = self.registers.pc();
+        self.registers.inc_pc(size as usize);
+        self.read_int(pc, size)
+    }
 
-            const MAX_STACK_VIEW_RANGE: usize = 32;
-            let stack_top = self.memory.get_stack_base() - self.registers.get(Registers::STACK_TOP_POINTER) as Address;
-            let top_bound = stack_top.saturating_sub(MAX_STACK_VIEW_RANGE);
-            let base_bound = stack_top;
 
-            println!(
-                "Stack: {:#X} {:?} {:#X}",
-                top_bound, &self.memory.get_raw()[top_bound .. base_bound], stack_top
-            );
+    /// Get the `size`-sized value at the next address literal operand in the bytecode
+    #[inline(always)]
+    fn get_next_addr_literal_operand(&mut self, size: Byte) -> u64 {
+        let address = self.get_next_address();
+        self.read_int(address, size)
+    }
 
-            io::stdin().read_line(&mut String::new()).unwrap();
 
-            self.handle_instruction(opcode);
+    /// Compare the two values and set the arithmetical flags accordingly.
+    /// The flags are those of the subtraction `left_value - right_value`: the carry flag is the unsigned borrow and the
+    /// overflow flag is the signed overflow, so that signed conditional jumps stay correct when the subtraction overflows.
+    #[inline(always)]
+    fn compare(&mut self, left_value: u64, right_value: u64) {
+        let (result, overflow) = (left_value as i64).overflowing_sub(right_value as i64);
 
-        }
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result as u64),
+            0,
+            left_value < right_value,
+            overflow
+        );
     }
 
 
-    fn display_registers(&self) -> String {
-        self.registers.iter().enumerate().fold(String::new(), |mut output, (i, reg)| {
-            output.push_str(format!("{}: {}, ", Registers::from(i as u8), reg).as_str());
-            output
-        })
-    }
+    /// Run the program, caching every basic block of the program image the first time it's executed.
+    /// 
+    /// A basic block is a run of instructions that ends with the first instruction that may jump.
+    /// Executing a cached block again skips fetching and decoding its instructions, and the instructions of a block are
+    /// dispatched one after the other without looking up the pc in between.
+    /// The cache is never invalidated, so this assumes the program doesn't modify its own code.
+    fn run(&mut self, program_size: usize) -> ! {
 
+        let mut decoded_blocks: Vec<Option<Box<[DecodedInstruction]>>> = vec![None; program_size];
 
-    fn run_verbose(&mut self) {
         loop {
-            let opcode = ByteCodes::from(self.get_next_byte());
-            println!("PC: {}, opcode: {}", self.registers.pc(), opcode);
-            self.handle_instruction(opcode);
-        }
-    }
+            let pc = self.registers.pc();
 
-    
-    fn handle_instruction(&mut self, opcode: ByteCodes) {
-        match opcode {
+            let Some(cached_block) = decoded_blocks.get_mut(pc) else {
+                // Code outside of the program image is never cached
+                let opcode = self.get_next_byte();
+                self.handle_instruction(opcode);
+                continue;
+            };
 
-            ByteCodes::INTEGER_ADD => {
-                let r1 = self.registers.get(Registers::R1);
-                let r2 = self.registers.get(Registers::R2);
-                
-                let (result, carry) = match r1.checked_add(r2) {
-                    Some(result) => (result, false),
-                    None => (r1.wrapping_add(r2), true)
-                };
+            let block = cached_block.get_or_insert_with(|| self.decode_block(pc, program_size));
 
-                self.registers.set(Registers::R1, result);
+            // A block that jumps back to its own start is a loop: keep running it without looking it up again
+            loop {
+                for &instruction in block.iter() {
+                    self.execute_decoded_instruction(instruction);
+                }
 
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    carry,
-                    carry ^ is_msb_set(result)
-                );
-            },
+                if self.registers.pc() != pc {
+                    break;
+                }
+            }
+        }
+    }
 
-            ByteCodes::INTEGER_SUB => {
-                let r1 = self.registers.get(Registers::R1);
-                let r2 = self.registers.get(Registers::R2);
 
-                let (result, carry) = match r1.checked_sub(r2) {
-                    Some(result) => (result, false),
-                    None => (r1.wrapping_sub(r2), true)
-                };
+    /// Decode the basic block starting at the given address.
+    /// The block ends after the first instruction that may jump, or at the end of the program image.
+    #[cold]
+    #[inline(never)]
+    fn decode_block(&self, start_address: Address, program_size: usize) -> Box<[DecodedInstruction]> {
 
-                self.registers.set(Registers::R1, result);
+        let mut block = Vec::new();
+        let mut address = start_address;
 
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    carry,
-                    carry ^ is_msb_set(result)
-                );
-            },
+        loop {
+            let instruction = self.decode_instruction(address);
 
-            ByteCodes::INTEGER_MUL => {
-                let r1 = self.registers.get(Registers::R1);
-                let r2 = self.registers.get(Registers::R2);
+            if block.last().is_some_and(|previous: &DecodedInstruction| matches!(previous.operation, DecodedOperation::NoOperation)) {
+                block.pop();
+            }
 
-                let (result, carry) = match r1.checked_mul(r2) {
-                    Some(result) => (result, false),
-                    None => (r1.wrapping_mul(r2), true)
-                };
+            let fused_instruction = block.last().and_then(|previous: &DecodedInstruction|
+                previous.fuse_memory_copies(&instruction).or_else(|| previous.fuse_conditional_jump(&instruction))
+            );
 
-                self.registers.set(Registers::R1, result);
+            if let Some(fused_instruction) = fused_instruction {
+                *block.last_mut().unwrap() = fused_instruction;
+            } else {
+                block.push(instruction);
+            }
 
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    carry,
-                    carry ^ is_msb_set(result)
-                );
-            },
+            if self.may_jump(address) {
+                return block.into_boxed_slice();
+            }
 
-            ByteCodes::INTEGER_DIV => {
-                let r1 = self.registers.get(Registers::R1);
-                let r2 = self.registers.get(Registers::R2);
-        
-                if r2 == 0 {
-                    self.registers.set_error(ErrorCodes::ZeroDivision);
-                    return;
-                }
-        
-                // Assume no carry or overflow
-                let result = r1 / r2;
-                
-                self.registers.set(Registers::R1, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    r1 % r2,
-                    false,
-                    false
-                );  
-            },
+            address += self.instruction_size(address);
 
-            ByteCodes::INTEGER_MOD => {
-                let r1 = self.registers.get(Registers::R1);
-                let r2 = self.registers.get(Registers::R2);
+            if address >= program_size {
+                return block.into_boxed_slice();
+            }
+        }
+    }
 
-                if r2 == 0 {
-                    self.registers.set_error(ErrorCodes::ZeroDivision);
-                    return;
-                }
 
-                let result = r1 % r2;
+    /// Return whether the instruction at the given address may set the pc to anything other than the address right after it.
+    /// Besides the jump instructions, this is the case of any instruction that writes into the pc register.
+    fn may_jump(&self, address: Address) -> bool {
 
-                self.registers.set(Registers::R1, result);
+        let opcode = self.memory.get_byte(address);
+        if opcode as usize >= BYTE_CODE_COUNT {
+            return true;
+        }
 
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    false,
-                    false
-                );
-            },
+        let writes_pc = |dest_reg_offset: usize| self.memory.get_byte(address + dest_reg_offset) == Registers::PROGRAM_COUNTER as Byte;
 
-            ByteCodes::FLOAT_ADD => {
-                let r1 = self.registers.get(Registers::R1) as f64;
-                let r2 = self.registers.get(Registers::R2) as f64;
-                
-                let result = r1 + r2;
-
-                self.registers.set(Registers::R1, result as u64);
-
-                self.set_arithmetical_flags(
-                    result == 0.0,
-                    result.is_sign_negative(),
-                    // Use unused integer flags as float flags
-                    result.is_nan() as u64,
-                    result.is_infinite() && result.is_sign_positive(),
-                    result.is_infinite() && result.is_sign_negative()
-                );
-            },
+        match ByteCodes::from(opcode) {
 
-            ByteCodes::FLOAT_SUB => {
-                let r1 = self.registers.get(Registers::R1) as f64;
-                let r2 = self.registers.get(Registers::R2) as f64;
-                
-                let result = r1 - r2;
-        
-                self.registers.set(Registers::R1, result as u64);
-        
-                self.set_arithmetical_flags(
-                    result == 0.0,
-                    result.is_sign_negative(),
-                    // Use unused integer flags as float flags
-                    result.is_nan() as u64,
-                    result.is_infinite() && result.is_sign_positive(),
-                    result.is_infinite() && result.is_sign_negative()
-                );
-            },
+            ByteCodes::INC_REG
+            | ByteCodes::DEC_REG
+            | ByteCodes::MOVE_INTO_REG_FROM_REG
+                => writes_pc(1),
 
-            ByteCodes::FLOAT_MUL => {
-                let r1 = self.registers.get(Registers::R1) as f64;
-                let r2 = self.registers.get(Registers::R2) as f64;
-                
-                let result = r1 * r2;
-        
-                self.registers.set(Registers::R1, result as u64);
-        
-                self.set_arithmetical_flags(
-                    result == 0.0,
-                    result.is_sign_negative(),
-                    // Use unused integer flags as float flags
-                    result.is_nan() as u64,
-                    result.is_infinite() && result.is_sign_positive(),
-                    result.is_infinite() && result.is_sign_negative()
-                );
-            },
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG
+            | ByteCodes::MOVE_INTO_REG_FROM_CONST
+            | ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL
+            | ByteCodes::POP_INTO_REG
+                => writes_pc(2),
 
-            ByteCodes::FLOAT_DIV => {
-                let r1 = self.registers.get(Registers::R1) as f64;
-                let r2 = self.registers.get(Registers::R2) as f64;
-                
-                let result = r1 / r2;
-        
-                self.registers.set(Registers::R1, result as u64);
-        
-                self.set_arithmetical_flags(
-                    result == 0.0,
-                    result.is_sign_negative(),
-                    // Use unused integer flags as float flags
-                    result.is_nan() as u64,
-                    result.is_infinite() && result.is_sign_positive(),
-                    result.is_infinite() && result.is_sign_negative()
-                );
-            },
+            ByteCodes::EXIT => true,
 
-            ByteCodes::FLOAT_MOD => {
-                let r1 = self.registers.get(Registers::R1) as f64;
-                let r2 = self.registers.get(Registers::R2) as f64;
-                
-                let result = r1 % r2;
-        
-                self.registers.set(Registers::R1, result as u64);
-        
-                self.set_arithmetical_flags(
-                    result == 0.0,
-                    result.is_sign_negative(),
-                    // Use unused integer flags as float flags
-                    result.is_nan() as u64,
-                    result.is_infinite() && result.is_sign_positive(),
-                    result.is_infinite() && result.is_sign_negative()
-                );
-            },
+            byte_code => is_jump_instruction(byte_code)
+        }
+    }
 
-            ByteCodes::INC_REG => {
-                let dest_reg = Registers::from(self.get_next_byte());
-                let value = self.registers.get(dest_reg);
-        
-                let (result, carry) = match value.checked_add(1) {
-                    Some(result) => (result, false),
-                    None => (value.saturating_add(1), true)
-                };
-        
-                self.registers.set(dest_reg, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    carry,
-                    carry ^ is_msb_set(result)
-                );  
-            },
 
-            ByteCodes::INC_ADDR_IN_REG => {
-                let size = self.get_next_byte();
-                let address_reg = Registers::from(self.get_next_byte());
-                let address: Address = self.registers.get(address_reg) as Address;
-                
-                self.increment_bytes(address, size);
-            },
+    /// Decode the instruction at the given address
+    fn decode_instruction(&self, address: Address) -> DecodedInstruction {
 
-            ByteCodes::INC_ADDR_LITERAL => {
-                let size = self.get_next_byte();
-                let dest_address = self.get_next_address();
-                
-                self.increment_bytes(dest_address, size);
-            },
+        let operands_address = address + 1;
 
-            ByteCodes::DEC_REG => {
-                let dest_reg = Registers::from(self.get_next_byte());
-                let value = self.registers.get(dest_reg);
-        
-                let (result, carry) = match value.checked_sub(1) {
-                    Some(result) => (result, false),
-                    None => (value.wrapping_sub(1), true)
-                };
-        
-                self.registers.set(dest_reg, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    carry,
-                    carry ^ is_msb_set(result)
-                );
-            },
+        if let Some((operation, operands_size)) = self.decode_operation(address) {
+            DecodedInstruction {
+                operation,
+                next_pc: operands_address + operands_size,
+            }
+        } else {
+            DecodedInstruction {
+                operation: DecodedOperation::Generic(Self::INSTRUCTION_HANDLERS[self.memory.get_byte(address) as usize]),
+                next_pc: operands_address,
+            }
+        }
+    }
 
-            ByteCodes::DEC_ADDR_IN_REG => {
-                let size = self.get_next_byte();
-                let address_reg = Registers::from(self.get_next_byte());
-                let address: Address = self.registers.get(address_reg) as Address;
-                
-                self.decrement_bytes(address, size);
-            },
 
-            ByteCodes::DEC_ADDR_LITERAL => {
-                let size = self.get_next_byte();
-            let dest_address = self.get_next_address();
-            
-            self.decrement_bytes(dest_address, size);
-            },
+    /// Decode the specialized operation of the instruction at the given address, together with the size of its operands.
+    /// 
+    /// Return `None` if the instruction has no specialized operation or its operands are invalid, in which case it's left to
+    /// its generic handler. Decoding never fails, since blocks are decoded ahead of execution and invalid instructions must
+    /// only be reported if they actually get executed.
+    fn decode_operation(&self, address: Address) -> Option<(DecodedOperation, usize)> {
+
+        let opcode = self.memory.get_byte(address);
+        if opcode as usize >= BYTE_CODE_COUNT {
+            return None;
+        }
 
-            ByteCodes::NO_OPERATION => {
-                // No operation
-            },
+        let operands_address = address + 1;
 
-            ByteCodes::MOVE_INTO_REG_FROM_REG => {
-                let dest_reg = Registers::from(self.get_next_byte());
-                let source_reg = Registers::from(self.get_next_byte());
-                self.registers.set(dest_reg, self.registers.get(source_reg));
-            },
+        let register_at = |offset: usize| {
+            let register = self.memory.get_byte(operands_address + offset);
+            (register < REGISTER_COUNT as u8).then(|| Registers::from(register))
+        };
+        // The generic compare handlers read each register while the pc is still in the middle of the operands, so a
+        // compare of the pc can't be decoded into an operation that runs with the pc already past the instruction
+        let compared_register_at = |offset: usize| register_at(offset).filter(|&register| !matches!(register, Registers::PROGRAM_COUNTER));
+        let const_at = |offset: usize, size: Byte| {
+            matches!(size, 1 | 2 | 4 | 8).then(|| self.read_int(operands_address + offset, size))
+        };
+        let address_at = |offset: usize| Address::from_le_bytes(self.memory.get_array(operands_address + offset));
+        // Address literal operands are decoded once here, while their size is only checked when the instruction is executed
+        let size = || self.memory.get_byte(operands_address);
 
-            ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG => {
-                let size = self.get_next_byte();
-                let dest_reg = Registers::from(self.get_next_byte());
-                let address_reg = Registers::from(self.get_next_byte());
-                let src_address = self.registers.get(address_reg) as Address;
+        Some(match ByteCodes::from(opcode) {
 
-                self.move_bytes_into_register(src_address, dest_reg, size);
-            },
+            ByteCodes::NO_OPERATION => (DecodedOperation::NoOperation, 0),
+
+            ByteCodes::INTEGER_ADD => (DecodedOperation::IntegerAdd, 0),
+
+            ByteCodes::INTEGER_SUB => (DecodedOperation::IntegerSub, 0),
+
+            ByteCodes::INTEGER_MUL => (DecodedOperation::IntegerMul, 0),
+
+            ByteCodes::MOVE_INTO_REG_FROM_REG => (
+                DecodedOperation::MoveIntoRegFromReg { dest_reg: register_at(0)?, src_reg: register_at(1)? },
+                2
+            ),
 
             ByteCodes::MOVE_INTO_REG_FROM_CONST => {
-                let size = self.get_next_byte();
-                let dest_reg = Registers::from(self.get_next_byte());
-        
-                // Hack the borrow checker
-                let src_address = self.registers.pc();
-        
-                self.move_bytes_into_register(src_address, dest_reg, size);
-                self.registers.inc_pc(size as usize);
+                let size = self.memory.get_byte(operands_address);
+                (
+                    DecodedOperation::MoveIntoRegFromConst { dest_reg: register_at(1)?, value: const_at(2, size)? },
+                    2 + size as usize
+                )
             },
-            
-            ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL => {
-                let size = self.get_next_byte();
-                let dest_reg = Registers::from(self.get_next_byte());
-                let src_address = self.get_next_address();
 
-                self.move_bytes_into_register(src_address, dest_reg, size);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_REG => {
-                let size = self.get_next_byte();
-                let dest_address_reg = Registers::from(self.get_next_byte());
-                let src_reg = Registers::from(self.get_next_byte());
-                let dest_address = self.registers.get(dest_address_reg) as Address;
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL => (
+                DecodedOperation::MoveIntoRegFromAddrLiteral { size: size(), dest_reg: register_at(1)?, src_address: address_at(2) },
+                2 + ADDRESS_SIZE
+            ),
+
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_REG => (
+                DecodedOperation::MoveIntoAddrLiteralFromReg { size: size(), dest_address: address_at(1), src_reg: register_at(1 + ADDRESS_SIZE)? },
+                2 + ADDRESS_SIZE
+            ),
 
-                self.move_from_register_into_address(src_reg, dest_address, size);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_IN_REG => {
-                let size = self.get_next_byte();
-                let dest_address_reg = Registers::from(self.get_next_byte());
-                let src_address_reg = Registers::from(self.get_next_byte());
-                let dest_address = self.registers.get(dest_address_reg) as Address;
-                let src_address = self.registers.get(src_address_reg) as Address;
-                
-                self.memory.memcpy(src_address, dest_address, size as usize);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_CONST => {
-                let size = self.get_next_byte();
-                let dest_address_reg = Registers::from(self.get_next_byte());
-                let dest_address = self.registers.get(dest_address_reg) as Address;
-                let src_address = self.registers.pc();
-                
-                self.memory.memcpy(src_address, dest_address, size as usize);
-                self.registers.inc_pc(size as usize);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_LITERAL => {
-                let size = self.get_next_byte();
-                let dest_address_reg = Registers::from(self.get_next_byte());
-                let dest_address = self.registers.get(dest_address_reg) as Address;
-                let src_address = self.get_next_address();
-        
-                self.memory.memcpy(src_address, dest_address, size as usize);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_REG => {
-                let size = self.get_next_byte();
-                let dest_address = self.get_next_address();
-                let src_reg = Registers::from(self.get_next_byte());
-        
-                self.move_from_register_into_address(src_reg, dest_address, size);
-            },
-            
-            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_IN_REG => {
-                let size = self.get_next_byte();
-                let dest_address = self.get_next_address();
-                let src_address_reg = Registers::from(self.get_next_byte());
-                let src_address = self.registers.get(src_address_reg) as Address;
-        
-                self.memory.memcpy(src_address, dest_address, size as usize);  
-            },
-            
             ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_CONST => {
-                let size = self.get_next_byte();
-                let dest_address = self.get_next_address();
-                let src_address = self.registers.pc();
-        
-                self.memory.memcpy(src_address, dest_address, size as usize);
-                self.registers.inc_pc(size as usize);
+                let size = self.memory.get_byte(operands_address);
+                (
+                    DecodedOperation::MoveIntoAddrLiteralFromConst { size, dest_address: address_at(1), value: const_at(1 + ADDRESS_SIZE, size)? },
+                    1 + ADDRESS_SIZE + size as usize
+                )
             },
-            
-            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL => {
-                let size = self.get_next_byte();
-                let dest_address = self.get_next_address();
-                let src_address = self.get_next_address();
 
-                self.memory.memcpy(src_address, dest_address, size as usize);
-            },
-            
-            ByteCodes::PUSH_FROM_REG => {
-                let src_reg = Registers::from(self.get_next_byte());
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL => (
+                DecodedOperation::MemoryCopy { src_address: address_at(1 + ADDRESS_SIZE), dest_address: address_at(1), size: size() as u32 },
+                1 + ADDRESS_SIZE * 2
+            ),
 
-                self.push_stack(self.registers.get(src_reg));
-            },
-            
-            ByteCodes::PUSH_FROM_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+            ByteCodes::INC_REG => (DecodedOperation::IncReg(register_at(0)?), 1),
 
-                let src_address_reg = Registers::from(self.get_next_byte());
-                let src_address = self.registers.get(src_address_reg) as Address;
-        
-                self.push_stack_from_address(src_address, size as usize);  
-            },
-            
-            ByteCodes::PUSH_FROM_CONST => {
-                let size = self.get_next_byte();
+            ByteCodes::INC_ADDR_LITERAL => (DecodedOperation::IncAddrLiteral { size: size(), address: address_at(1) }, 1 + ADDRESS_SIZE),
 
-                // Hack to get around the borrow checker
-                self.push_stack_from_address(self.registers.pc(), size as usize);
-                self.registers.inc_pc(size as usize);
-            },
-            
-            ByteCodes::PUSH_FROM_ADDR_LITERAL => {
-                let size = self.get_next_byte();
+            ByteCodes::DEC_REG => (DecodedOperation::DecReg(register_at(0)?), 1),
 
-                let src_address = self.get_next_address();
+            ByteCodes::DEC_ADDR_LITERAL => (DecodedOperation::DecAddrLiteral { size: size(), address: address_at(1) }, 1 + ADDRESS_SIZE),
 
-                self.push_stack_from_address(src_address, size as usize);
-            },
-            
-            ByteCodes::PUSH_STACK_POINTER_REG => {
-                let reg = Registers::from(self.get_next_byte());
-                let offset = self.registers.get(reg);
-        
-                self.push_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::PUSH_STACK_POINTER_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+            ByteCodes::COMPARE_REG_REG => (
+                DecodedOperation::CompareRegReg { left_reg: compared_register_at(0)?, right_reg: compared_register_at(1)? },
+                2
+            ),
 
-                let address_reg = Registers::from(self.get_next_byte());
-                let address = self.registers.get(address_reg) as Address;
-        
-                let offset = bytes_to_int(self.memory.get_bytes(address, size as usize), size);
-        
-                self.push_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::PUSH_STACK_POINTER_CONST => {
-                let size = self.get_next_byte();
+            ByteCodes::COMPARE_REG_CONST => {
+                let size = self.memory.get_byte(operands_address);
+                (
+                    DecodedOperation::CompareRegConst { left_reg: compared_register_at(1)?, right_value: const_at(2, size)? },
+                    2 + size as usize
+                )
+            },
+
+            ByteCodes::JUMP => (DecodedOperation::Jump(address_at(0)), ADDRESS_SIZE),
+
+            jump @ (
+                ByteCodes::JUMP_NOT_ZERO
+                | ByteCodes::JUMP_ZERO
+                | ByteCodes::JUMP_GREATER
+                | ByteCodes::JUMP_LESS
+                | ByteCodes::JUMP_GREATER_OR_EQUAL
+                | ByteCodes::JUMP_LESS_OR_EQUAL
+                | ByteCodes::JUMP_CARRY
+                | ByteCodes::JUMP_NOT_CARRY
+                | ByteCodes::JUMP_OVERFLOW
+                | ByteCodes::JUMP_NOT_OVERFLOW
+                | ByteCodes::JUMP_SIGN
+                | ByteCodes::JUMP_NOT_SIGN
+            ) => (DecodedOperation::ConditionalJump { jump, jump_address: address_at(0) }, ADDRESS_SIZE),
+
+            ByteCodes::CALL => (DecodedOperation::Call(address_at(0)), ADDRESS_SIZE),
+
+            _ => return None
+        })
+    }
 
-                let offset = bytes_to_int(self.get_next_bytes(size as usize), size);
-        
-                self.push_stack_pointer(offset as usize);  
-            },
-            
-            ByteCodes::PUSH_STACK_POINTER_ADDR_LITERAL => {
-                let size = self.get_next_byte();
 
-                let address = self.get_next_address();
-        
-                let offset = bytes_to_int(self.memory.get_bytes(address, size as usize), size);
-        
-                self.push_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::POP_INTO_REG => {
-                let size = self.get_next_byte();
+    /// Return the size in bytes of the instruction at the given address, opcode included.
+    /// 
+    /// The opcode must be valid.
+    fn instruction_size(&self, address: Address) -> usize {
+
+        // Sizes of the operand kinds
+        const SIZE: usize = 1;
+        const REG: usize = 1;
+        const ADDR_IN_REG: usize = 1;
+        const ADDR_LITERAL: usize = ADDRESS_SIZE;
+        const INTERRUPT_CODE: usize = 1;
+        // The size of constant operands is given by the size operand that follows the opcode
+        let constant = || self.memory.get_byte(address + 1) as usize;
+
+        let operands_size = match ByteCodes::from(self.memory.get_byte(address)) {
+
+            ByteCodes::INTEGER_ADD
+            | ByteCodes::INTEGER_SUB
+            | ByteCodes::INTEGER_MUL
+            | ByteCodes::INTEGER_DIV
+            | ByteCodes::INTEGER_MOD
+            | ByteCodes::FLOAT_ADD
+            | ByteCodes::FLOAT_SUB
+            | ByteCodes::FLOAT_MUL
+            | ByteCodes::FLOAT_DIV
+            | ByteCodes::FLOAT_MOD
+            | ByteCodes::NO_OPERATION
+            | ByteCodes::LABEL
+            | ByteCodes::RETURN
+            | ByteCodes::AND
+            | ByteCodes::OR
+            | ByteCodes::XOR
+            | ByteCodes::NOT
+            | ByteCodes::SHIFT_LEFT
+            | ByteCodes::SHIFT_RIGHT
+            | ByteCodes::EXIT
+                => 0,
+
+            ByteCodes::INC_REG
+            | ByteCodes::DEC_REG
+            | ByteCodes::PUSH_FROM_REG
+            | ByteCodes::PUSH_STACK_POINTER_REG
+            | ByteCodes::POP_STACK_POINTER_REG
+            | ByteCodes::INTERRUPT_REG
+                => REG,
+
+            ByteCodes::INTERRUPT_ADDR_IN_REG => ADDR_IN_REG,
+
+            ByteCodes::INTERRUPT_CONST => INTERRUPT_CODE,
+
+            ByteCodes::INTERRUPT_ADDR_LITERAL
+            | ByteCodes::JUMP
+            | ByteCodes::JUMP_NOT_ZERO
+            | ByteCodes::JUMP_ZERO
+            | ByteCodes::JUMP_GREATER
+            | ByteCodes::JUMP_LESS
+            | ByteCodes::JUMP_GREATER_OR_EQUAL
+            | ByteCodes::JUMP_LESS_OR_EQUAL
+            | ByteCodes::JUMP_CARRY
+            | ByteCodes::JUMP_NOT_CARRY
+            | ByteCodes::JUMP_OVERFLOW
+            | ByteCodes::JUMP_NOT_OVERFLOW
+            | ByteCodes::JUMP_SIGN
+            | ByteCodes::JUMP_NOT_SIGN
+            | ByteCodes::CALL
+                => ADDR_LITERAL,
+
+            ByteCodes::MOVE_INTO_REG_FROM_REG => REG + REG,
+            ByteCodes::COMPARE_REG_REG => REG + REG,
+
+            ByteCodes::INC_ADDR_IN_REG
+            | ByteCodes::DEC_ADDR_IN_REG
+            | ByteCodes::PUSH_FROM_ADDR_IN_REG
+            | ByteCodes::PUSH_STACK_POINTER_ADDR_IN_REG
+            | ByteCodes::POP_INTO_ADDR_IN_REG
+            | ByteCodes::POP_STACK_POINTER_ADDR_IN_REG
+                => SIZE + ADDR_IN_REG,
+
+            ByteCodes::POP_INTO_REG => SIZE + REG,
+
+            ByteCodes::INC_ADDR_LITERAL
+            | ByteCodes::DEC_ADDR_LITERAL
+            | ByteCodes::PUSH_FROM_ADDR_LITERAL
+            | ByteCodes::PUSH_STACK_POINTER_ADDR_LITERAL
+            | ByteCodes::POP_INTO_ADDR_LITERAL
+            | ByteCodes::POP_STACK_POINTER_ADDR_LITERAL
+                => SIZE + ADDR_LITERAL,
+
+            ByteCodes::PUSH_FROM_CONST
+            | ByteCodes::PUSH_STACK_POINTER_CONST
+            | ByteCodes::POP_STACK_POINTER_CONST
+                => SIZE + constant(),
+
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG => SIZE + REG + ADDR_IN_REG,
+            ByteCodes::MOVE_INTO_REG_FROM_CONST => SIZE + REG + constant(),
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL => SIZE + REG + ADDR_LITERAL,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_REG => SIZE + ADDR_IN_REG + REG,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_IN_REG => SIZE + ADDR_IN_REG + ADDR_IN_REG,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_CONST => SIZE + ADDR_IN_REG + constant(),
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_LITERAL => SIZE + ADDR_IN_REG + ADDR_LITERAL,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_REG => SIZE + ADDR_LITERAL + REG,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_IN_REG => SIZE + ADDR_LITERAL + ADDR_IN_REG,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_CONST => SIZE + ADDR_LITERAL + constant(),
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL => SIZE + ADDR_LITERAL + ADDR_LITERAL,
+
+            ByteCodes::COMPARE_REG_ADDR_IN_REG => SIZE + REG + ADDR_IN_REG,
+            ByteCodes::COMPARE_REG_CONST => SIZE + REG + constant(),
+            ByteCodes::COMPARE_REG_ADDR_LITERAL => SIZE + REG + ADDR_LITERAL,
+            ByteCodes::COMPARE_ADDR_IN_REG_REG => SIZE + ADDR_IN_REG + REG,
+            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_IN_REG => SIZE + ADDR_IN_REG + ADDR_IN_REG,
+            ByteCodes::COMPARE_ADDR_IN_REG_CONST => SIZE + ADDR_IN_REG + constant(),
+            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_LITERAL => SIZE + ADDR_IN_REG + ADDR_LITERAL,
+            ByteCodes::COMPARE_CONST_REG => SIZE + constant() + REG,
+            ByteCodes::COMPARE_CONST_ADDR_IN_REG => SIZE + constant() + ADDR_IN_REG,
+            ByteCodes::COMPARE_CONST_CONST => SIZE + constant() + constant(),
+            ByteCodes::COMPARE_CONST_ADDR_LITERAL => SIZE + constant() + ADDR_LITERAL,
+            ByteCodes::COMPARE_ADDR_LITERAL_REG => SIZE + ADDR_LITERAL + REG,
+            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_IN_REG => SIZE + ADDR_LITERAL + ADDR_IN_REG,
+            ByteCodes::COMPARE_ADDR_LITERAL_CONST => SIZE + ADDR_LITERAL + constant(),
+            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_LITERAL => SIZE + ADDR_LITERAL + ADDR_LITERAL,
+        };
 
-                let dest_reg = Registers::from(self.get_next_byte());
-                let bytes = self.pop_stack_bytes(size as usize);
-                let value = bytes_to_int(bytes, size);
-        
-                self.registers.set(dest_reg, value);
-            },
-            
-            ByteCodes::POP_INTO_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+        1 + operands_size
+    }
 
-                let dest_address_reg = Registers::from(self.get_next_byte());
-                let dest_address = self.registers.get(dest_address_reg) as Address;
-        
-                self.memory.memcpy(self.registers.stack_top(), dest_address, size as usize);
-        
-                self.pop_stack_pointer(size as usize);
-            },
-            
-            ByteCodes::POP_INTO_ADDR_LITERAL => {
-                let size = self.get_next_byte();
 
-                let dest_address = self.get_next_address();
-        
-                self.memory.memcpy(self.registers.stack_top(), dest_address, size as usize);
-        
-                self.pop_stack_pointer(size as usize);
-            },
-            
-            ByteCodes::POP_STACK_POINTER_REG => {
-                let reg = Registers::from(self.get_next_byte());
-                let offset = self.registers.get(reg);
+    /// Execute an instruction that has already been decoded.
+    /// 
+    /// The pc is moved past the instruction before executing it, just like when the operands are read from the bytecode.
+    #[inline(always)]
+    fn execute_decoded_instruction(&mut self, instruction: DecodedInstruction) {
+
+        self.jump_to(instruction.next_pc);
+
+        match instruction.operation {
+            DecodedOperation::Generic(handler) => handler(self),
+            DecodedOperation::NoOperation => {},
+            DecodedOperation::IntegerAdd => self.handle_integer_add(),
+            DecodedOperation::IntegerSub => self.handle_integer_sub(),
+            DecodedOperation::IntegerMul => self.handle_integer_mul(),
+            DecodedOperation::MoveIntoRegFromReg { dest_reg, src_reg } => self.registers.set(dest_reg, self.registers.get(src_reg)),
+            DecodedOperation::MoveIntoRegFromConst { dest_reg, value } => self.registers.set(dest_reg, value),
+            DecodedOperation::MoveIntoRegFromAddrLiteral { size, dest_reg, src_address } => self.move_bytes_into_register(src_address, dest_reg, size),
+            DecodedOperation::MoveIntoAddrLiteralFromReg { size, dest_address, src_reg } => self.move_from_register_into_address(src_reg, dest_address, size),
+            DecodedOperation::MoveIntoAddrLiteralFromConst { size, dest_address, value } => self.write_int(dest_address, value, size),
+            DecodedOperation::MemoryCopy { src_address, dest_address, size } => self.memory.memcpy(src_address, dest_address, size as usize),
+            DecodedOperation::IncReg(reg) => self.increment_register(reg),
+            DecodedOperation::IncAddrLiteral { size, address } => self.increment_bytes(address, size),
+            DecodedOperation::DecReg(reg) => self.decrement_register(reg),
+            DecodedOperation::DecAddrLiteral { size, address } => self.decrement_bytes(address, size),
+            DecodedOperation::CompareRegReg { left_reg, right_reg } => self.compare(self.registers.get(left_reg), self.registers.get(right_reg)),
+            DecodedOperation::CompareRegConst { left_reg, right_value } => self.compare(self.registers.get(left_reg), right_value),
+            DecodedOperation::Jump(jump_address) => self.jump_to(jump_address),
+            DecodedOperation::ConditionalJump { jump, jump_address } => self.jump_if_condition_met(jump, jump_address),
+            DecodedOperation::IncRegAndJump { reg, jump, jump_address } => {
+                self.increment_register(reg);
+                self.jump_if_condition_met(jump, jump_address);
+            },
+            DecodedOperation::DecRegAndJump { reg, jump, jump_address } => {
+                self.decrement_register(reg);
+                self.jump_if_condition_met(jump, jump_address);
+            },
+            DecodedOperation::CompareRegRegAndJump { left_reg, right_reg, jump, jump_address } => {
+                self.compare(self.registers.get(left_reg), self.registers.get(right_reg));
+                self.jump_if_condition_met(jump, jump_address);
+            },
+            DecodedOperation::CompareRegConstAndJump { left_reg, right_value, jump, jump_address } => {
+                self.compare(self.registers.get(left_reg), right_value);
+                self.jump_if_condition_met(jump, jump_address);
+            },
+            DecodedOperation::Call(jump_address) => self.call(jump_address),
+        }
+    }
 
-                self.pop_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::POP_STACK_POINTER_ADDR_IN_REG => {
-                let size = self.get_next_byte();
 
-                let address_reg = Registers::from(self.get_next_byte());
-                let address = self.registers.get(address_reg) as Address;
-        
-                let offset = bytes_to_int(self.memory.get_bytes(address, size as usize), size);
-        
-                self.pop_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::POP_STACK_POINTER_CONST => {
-                let size = self.get_next_byte();
+    fn run_interactive(&mut self, byte_code_size: usize) -> ! {
 
-                let offset = bytes_to_int(self.get_next_bytes(size as usize), size);
-        
-                self.pop_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::POP_STACK_POINTER_ADDR_LITERAL => {
-                let size = self.get_next_byte();
+        println!("Running VM in interactive mode");
+        println!("Byte code size is {} bytes", byte_code_size);
+        println!("Start address is: {:#X}", self.registers.pc());
+        println!();
 
-                let address = self.get_next_address();
-        
-                let offset = bytes_to_int(self.memory.get_bytes(address, size as usize), size);
-        
-                self.pop_stack_pointer(offset as usize);
-            },
-            
-            ByteCodes::LABEL => {
-                unreachable!() // TODO: maybe this should be removed then
-            },
-            
-            ByteCodes::JUMP => {
-                let addr = self.get_next_address();
-                self.jump_to(addr);
-            },
-            
-            ByteCodes::JUMP_NOT_ZERO => {
-                let jump_address = self.get_next_address();
+        loop {
 
-                if self.registers.get(Registers::ZERO_FLAG) == 0 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_ZERO => {
-                let jump_address = self.get_next_address();
+            let previous_args = self.memory.get_bytes(
+                self.interactive_last_instruction_pc,
+                self.registers.pc().saturating_sub(self.interactive_last_instruction_pc)
+            );
+            println!("Previous args: {:?}", previous_args);
 
-                if self.registers.get(Registers::ZERO_FLAG) == 1 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_GREATER => {
-                let jump_address = self.get_next_address();
+            let opcode = self.get_next_byte();
 
-                if self.registers.get(Registers::SIGN_FLAG) == self.registers.get(Registers::OVERFLOW_FLAG)
-                    && self.registers.get(Registers::ZERO_FLAG) == 0 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_LESS => {
-                let jump_address = self.get_next_address();
+            self.interactive_last_instruction_pc = self.registers.pc();
 
-                if self.registers.get(Registers::SIGN_FLAG) != self.registers.get(Registers::OVERFLOW_FLAG) {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_GREATER_OR_EQUAL => {
-                let jump_address = self.get_next_address();
+            println!();
 
-                if self.registers.get(Registers::SIGN_FLAG) == self.registers.get(Registers::OVERFLOW_FLAG) {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_LESS_OR_EQUAL => {
-                let jump_address = self.get_next_address();
+            println!("PC: {}, opcode: {}", self.registers.pc(), ByteCodes::from(opcode));
+            println!("Registers: {}", self.display_registers());
 
-                if self.registers.get(Registers::SIGN_FLAG) != self.registers.get(Registers::OVERFLOW_FLAG)
-                    || self.registers.get(Registers::ZERO_FLAG) == 1 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_CARRY => {
-                let jump_address = self.get_next_address();
+            const MAX_STACK_VIEW_RANGE: usize = 32;
+            let stack_top = self.memory.get_stack_base() - self.registers.get(Registers::STACK_TOP_POINTER) as Address;
+            let top_bound = stack_top.saturating_sub(MAX_STACK_VIEW_RANGE);
+            let base_bound = stack_top;
 
-                if self.registers.get(Registers::CARRY_FLAG) == 1 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_NOT_CARRY => {
-                let jump_address = self.get_next_address();
+            println!(
+                "Stack: {:#X} {:?} {:#X}",
+                top_bound, &self.memory.get_raw()[top_bound .. base_bound], stack_top
+            );
 
-                if self.registers.get(Registers::CARRY_FLAG) == 0 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_OVERFLOW => {
-                let jump_address = self.get_next_address();
+            io::stdin().read_line(&mut String::new()).unwrap();
 
-                if self.registers.get(Registers::OVERFLOW_FLAG) == 1 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_NOT_OVERFLOW => {
-                let jump_address = self.get_next_address();
+            self.handle_instruction(opcode);
 
-                if self.registers.get(Registers::OVERFLOW_FLAG) == 0 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::JUMP_SIGN => {
-                let jump_address = self.get_next_address();
+        }
+    }
 
-                if self.registers.get(Registers::SIGN_FLAG) == 1 {
-                    self.jump_to(jump_address);
-                }  
-            },
-            
-            ByteCodes::JUMP_NOT_SIGN => {
-                let jump_address = self.get_next_address();
 
-                if self.registers.get(Registers::SIGN_FLAG) == 0 {
-                    self.jump_to(jump_address);
-                }
-            },
-            
-            ByteCodes::CALL => {
-                let jump_address = self.get_next_address();
+    fn display_registers(&self) -> String {
+        self.registers.iter().enumerate().fold(String::new(), |mut output, (i, reg)| {
+            output.push_str(format!("{}: {}, ", Registers::from(i as u8), reg).as_str());
+            output
+        })
+    }
 
-                // Push the return address onto the stack (return address is the current pc)
-                self.push_stack(self.registers.pc() as u64);
-        
-                // Jump to the subroutine
-                self.jump_to(jump_address);
-            },
-            
-            ByteCodes::RETURN => {
-                // Get the return address from the stack
-                let return_address = bytes_as_address(
-                    self.pop_stack_bytes(ADDRESS_SIZE)
-                );
 
-                // Jump to the return address
-                self.jump_to(return_address);
-            },
-            
-            ByteCodes::COMPARE_REG_REG => {
-                let left_reg = Registers::from(self.get_next_byte());
-                let right_reg = Registers::from(self.get_next_byte());
-            
-                let result = self.registers.get(left_reg) as i64 - self.registers.get(right_reg) as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_REG_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+    fn run_verbose(&mut self) -> ! {
+        loop {
+            let opcode = self.get_next_byte();
+            println!("PC: {}, opcode: {}", self.registers.pc(), ByteCodes::from(opcode));
+            self.handle_instruction(opcode);
+        }
+    }
+
+
+    fn handle_integer_add(&mut self) {
+        let r1 = self.registers.get(Registers::R1);
+        let r2 = self.registers.get(Registers::R2);
+
+        let (result, carry) = r1.overflowing_add(r2);
+        let (_, overflow) = (r1 as i64).overflowing_add(r2 as i64);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_integer_flags(result, carry, overflow);
+    }
+
+
+    fn handle_integer_sub(&mut self) {
+        let r1 = self.registers.get(Registers::R1);
+        let r2 = self.registers.get(Registers::R2);
+
+        let (result, carry) = r1.overflowing_sub(r2);
+        let (_, overflow) = (r1 as i64).overflowing_sub(r2 as i64);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_integer_flags(result, carry, overflow);
+    }
+
+
+    fn handle_integer_mul(&mut self) {
+        let r1 = self.registers.get(Registers::R1);
+        let r2 = self.registers.get(Registers::R2);
+
+        let (result, carry) = r1.overflowing_mul(r2);
+        let (_, overflow) = (r1 as i64).overflowing_mul(r2 as i64);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_integer_flags(result, carry, overflow);
+    }
+
+
+    fn handle_integer_div(&mut self) {
+        let r1 = self.registers.get(Registers::R1);
+        let r2 = self.registers.get(Registers::R2);
+
+        if r2 == 0 {
+            self.registers.set_error(ErrorCodes::ZeroDivision);
+            return;
+        }
+
+        // Assume no carry or overflow
+        let result = r1 / r2;
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            r1 % r2,
+            false,
+            false
+        );  
+    }
+
+
+    fn handle_integer_mod(&mut self) {
+        let r1 = self.registers.get(Registers::R1);
+        let r2 = self.registers.get(Registers::R2);
+
+        if r2 == 0 {
+            self.registers.set_error(ErrorCodes::ZeroDivision);
+            return;
+        }
+
+        let result = r1 % r2;
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            false,
+            false
+        );
+    }
+
+
+    fn handle_float_add(&mut self) {
+        let r1 = self.registers.get(Registers::R1) as f64;
+        let r2 = self.registers.get(Registers::R2) as f64;
+
+        let result = r1 + r2;
+
+        self.registers.set(Registers::R1, result as u64);
+
+        self.set_arithmetical_flags(
+            result == 0.0,
+            result.is_sign_negative(),
+            // Use unused integer flags as float flags
+            result.is_nan() as u64,
+            result.is_infinite() && result.is_sign_positive(),
+            result.is_infinite() && result.is_sign_negative()
+        );
+    }
+
+
+    fn handle_float_sub(&mut self) {
+        let r1 = self.registers.get(Registers::R1) as f64;
+        let r2 = self.registers.get(Registers::R2) as f64;
+
+        let result = r1 - r2;
+
+        self.registers.set(Registers::R1, result as u64);
+
+        self.set_arithmetical_flags(
+            result == 0.0,
+            result.is_sign_negative(),
+            // Use unused integer flags as float flags
+            result.is_nan() as u64,
+            result.is_infinite() && result.is_sign_positive(),
+            result.is_infinite() && result.is_sign_negative()
+        );
+    }
+
+
+    fn handle_float_mul(&mut self) {
+        let r1 = self.registers.get(Registers::R1) as f64;
+        let r2 = self.registers.get(Registers::R2) as f64;
+
+        let result = r1 * r2;
+
+        self.registers.set(Registers::R1, result as u64);
+
+        self.set_arithmetical_flags(
+            result == 0.0,
+            result.is_sign_negative(),
+            // Use unused integer flags as float flags
+            result.is_nan() as u64,
+            result.is_infinite() && result.is_sign_positive(),
+            result.is_infinite() && result.is_sign_negative()
+        );
+    }
+
+
+    fn handle_float_div(&mut self) {
+        let r1 = self.registers.get(Registers::R1) as f64;
+        let r2 = self.registers.get(Registers::R2) as f64;
+
+        let result = r1 / r2;
+
+        self.registers.set(Registers::R1, result as u64);
+
+        self.set_arithmetical_flags(
+            result == 0.0,
+            result.is_sign_negative(),
+            // Use unused integer flags as float flags
+            result.is_nan() as u64,
+            result.is_infinite() && result.is_sign_positive(),
+            result.is_infinite() && result.is_sign_negative()
+        );
+    }
+
+
+    fn handle_float_mod(&mut self) {
+        let r1 = self.registers.get(Registers::R1) as f64;
+        let r2 = self.registers.get(Registers::R2) as f64;
+
+        let result = r1 % r2;
+
+        self.registers.set(Registers::R1, result as u64);
+
+        self.set_arithmetical_flags(
+            result == 0.0,
+            result.is_sign_negative(),
+            // Use unused integer flags as float flags
+            result.is_nan() as u64,
+            result.is_infinite() && result.is_sign_positive(),
+            result.is_infinite() && result.is_sign_negative()
+        );
+    }
+
+
+    fn handle_inc_reg(&mut self) {
+        let dest_reg = self.get_next_register();
+        self.increment_register(dest_reg);
+    }
+
+
+    /// Increment the given register
+    #[inline(always)]
+    fn increment_register(&mut self, dest_reg: Registers) {
+        let value = self.registers.get(dest_reg);
+
+        let (result, carry) = value.overflowing_add(1);
+
+        self.registers.set(dest_reg, result);
+
+        self.set_integer_flags(result, carry, result == i64::MIN as u64);
+    }
+
+
+    fn handle_inc_addr_in_reg(&mut self) {
+        let [size, address_reg] = self.get_next_array();
+        let address_reg = Registers::from(address_reg);
+        let address: Address = self.registers.get(address_reg) as Address;
+
+        self.increment_bytes(address, size);
+    }
+
+
+    fn handle_inc_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+        let dest_address = self.get_next_address();
+
+        self.increment_bytes(dest_address, size);
+    }
+
+
+    fn handle_dec_reg(&mut self) {
+        let dest_reg = self.get_next_register();
+        self.decrement_register(dest_reg);
+    }
+
+
+    /// Decrement the given register
+    #[inline(always)]
+    fn decrement_register(&mut self, dest_reg: Registers) {
+        let value = self.registers.get(dest_reg);
+
+        let (result, carry) = value.overflowing_sub(1);
+
+        self.registers.set(dest_reg, result);
+
+        self.set_integer_flags(result, carry, result == i64::MAX as u64);
+    }
+
+
+    fn handle_dec_addr_in_reg(&mut self) {
+        let [size, address_reg] = self.get_next_array();
+        let address_reg = Registers::from(address_reg);
+        let address: Address = self.registers.get(address_reg) as Address;
+
+        self.decrement_bytes(address, size);
+    }
+
+
+    fn handle_dec_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+        let dest_address = self.get_next_address();
+
+        self.decrement_bytes(dest_address, size);
+    }
+
+
+    fn handle_no_operation(&mut self) {
+        // No operation
+    }
+
+
+    fn handle_move_into_reg_from_reg(&mut self) {
+        let dest_reg = self.get_next_register();
+        let source_reg = self.get_next_register();
+        self.registers.set(dest_reg, self.registers.get(source_reg));
+    }
+
+
+    fn handle_move_into_reg_from_addr_in_reg(&mut self) {
+        let [size, dest_reg, address_reg] = self.get_next_array();
+        let dest_reg = Registers::from(dest_reg);
+        let address_reg = Registers::from(address_reg);
+        let src_address = self.registers.get(address_reg) as Address;
+
+        self.move_bytes_into_register(src_address, dest_reg, size);
+    }
+
+
+    fn handle_move_into_reg_from_const(&mut self) {
+        let size = self.get_next_byte();
+        let dest_reg = self.get_next_register();
+
+        // Hack the borrow checker
+        let src_address = self.registers.pc();
+
+        self.move_bytes_into_register(src_address, dest_reg, size);
+        self.registers.inc_pc(size as usize);
+    }
+
+
+    fn handle_move_into_reg_from_addr_literal(&mut self) {
+        let [size, dest_reg] = self.get_next_array();
+        let dest_reg = Registers::from(dest_reg);
+        let src_address = self.get_next_address();
+
+        self.move_bytes_into_register(src_address, dest_reg, size);
+    }
+
+
+    fn handle_move_into_addr_in_reg_from_reg(&mut self) {
+        let [size, dest_address_reg, src_reg] = self.get_next_array();
+        let dest_address_reg = Registers::from(dest_address_reg);
+        let src_reg = Registers::from(src_reg);
+        let dest_address = self.registers.get(dest_address_reg) as Address;
+
+        self.move_from_register_into_address(src_reg, dest_address, size);
+    }
+
+
+    fn handle_move_into_addr_literal_from_reg(&mut self) {
+        let size = self.get_next_byte();
+        let dest_address = self.get_next_address();
+        let src_reg = self.get_next_register();
+
+        self.move_from_register_into_address(src_reg, dest_address, size);
+    }
+
+
+    memory_move_handlers! {
+        handle_move_into_addr_in_reg_from_addr_in_reg: addr_in_reg, addr_in_reg;
+        handle_move_into_addr_in_reg_from_const: addr_in_reg, const;
+        handle_move_into_addr_in_reg_from_addr_literal: addr_in_reg, addr_literal;
+        handle_move_into_addr_literal_from_addr_in_reg: addr_literal, addr_in_reg;
+        handle_move_into_addr_literal_from_const: addr_literal, const;
+        handle_move_into_addr_literal_from_addr_literal: addr_literal, addr_literal;
+    }
+
+
+    fn handle_push_from_reg(&mut self) {
+        let src_reg = self.get_next_register();
+
+        self.push_stack(self.registers.get(src_reg));
+    }
+
+
+    fn handle_push_from_addr_in_reg(&mut self) {
+        let size = self.get_next_byte();
+        let src_address = operand_address!(self, addr_in_reg, size);
+
+        self.push_stack_from_address(src_address, size as usize);
+    }
+
+
+    fn handle_push_from_const(&mut self) {
+        let size = self.get_next_byte();
+        let src_address = operand_address!(self, const, size);
+
+        self.push_stack_from_address(src_address, size as usize);
+    }
+
+
+    fn handle_push_from_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+        let src_address = operand_address!(self, addr_literal, size);
+
+        self.push_stack_from_address(src_address, size as usize);
+    }
+
+
+    fn handle_push_stack_pointer_reg(&mut self) {
+        let offset = self.get_next_reg_operand(8);
+
+        self.push_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_push_stack_pointer_addr_in_reg(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_addr_in_reg_operand(size);
+
+        self.push_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_push_stack_pointer_const(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_const_operand(size);
+
+        self.push_stack_pointer(offset as usize);  
+    }
+
+
+    fn handle_push_stack_pointer_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_addr_literal_operand(size);
+
+        self.push_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_pop_into_reg(&mut self) {
+        let [size, dest_reg] = self.get_next_array();
+        let dest_reg = Registers::from(dest_reg);
+        let value = self.pop_stack(size);
+
+        self.registers.set(dest_reg, value);
+    }
+
+
+    fn handle_pop_into_addr_in_reg(&mut self) {
+        let size = self.get_next_byte();
+        let dest_address = operand_address!(self, addr_in_reg, size);
+
+        self.memory.memcpy(self.registers.stack_top(), dest_address, size as usize);
+
+        self.pop_stack_pointer(size as usize);
+    }
+
+
+    fn handle_pop_into_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+        let dest_address = operand_address!(self, addr_literal, size);
+
+        self.memory.memcpy(self.registers.stack_top(), dest_address, size as usize);
+
+        self.pop_stack_pointer(size as usize);
+    }
+
+
+    fn handle_pop_stack_pointer_reg(&mut self) {
+        let offset = self.get_next_reg_operand(8);
+
+        self.pop_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_pop_stack_pointer_addr_in_reg(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_addr_in_reg_operand(size);
+
+        self.pop_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_pop_stack_pointer_const(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_const_operand(size);
+
+        self.pop_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_pop_stack_pointer_addr_literal(&mut self) {
+        let size = self.get_next_byte();
+
+        let offset = self.get_next_addr_literal_operand(size);
+
+        self.pop_stack_pointer(offset as usize);
+    }
+
+
+    fn handle_label(&mut self) {
+        unreachable!() // TODO: maybe this should be removed then
+    }
+
+
+    fn handle_jump(&mut self) {
+        let addr = self.get_next_address();
+        self.jump_to(addr);
+    }
+
+
+    /// Return whether the condition of the given conditional jump instruction is met by the current flags.
+    /// Compound conditions combine the flag tests with non-short-circuiting operators, so evaluating them doesn't branch.
+    #[inline(always)]
+    fn is_jump_condition_met(&self, jump: ByteCodes) -> bool {
+        let zf = self.registers.get(Registers::ZERO_FLAG);
+        let sf = self.registers.get(Registers::SIGN_FLAG);
+        let cf = self.registers.get(Registers::CARRY_FLAG);
+        let of = self.registers.get(Registers::OVERFLOW_FLAG);
+
+        match jump {
+            ByteCodes::JUMP_NOT_ZERO => zf == 0,
+            ByteCodes::JUMP_ZERO => zf == 1,
+            ByteCodes::JUMP_GREATER => (sf == of) & (zf == 0),
+            ByteCodes::JUMP_LESS => sf != of,
+            ByteCodes::JUMP_GREATER_OR_EQUAL => sf == of,
+            ByteCodes::JUMP_LESS_OR_EQUAL => (sf != of) | (zf == 1),
+            ByteCodes::JUMP_CARRY => cf == 1,
+            ByteCodes::JUMP_NOT_CARRY => cf == 0,
+            ByteCodes::JUMP_OVERFLOW => of == 1,
+            ByteCodes::JUMP_NOT_OVERFLOW => of == 0,
+            ByteCodes::JUMP_SIGN => sf == 1,
+            ByteCodes::JUMP_NOT_SIGN => sf == 0,
+            _ => unreachable!("{} is not a conditional jump", jump)
+        }
+    }
+
+
+    /// Jump to the given address if the condition of the given conditional jump is met.
+    #[inline(always)]
+    fn jump_if_condition_met(&mut self, jump: ByteCodes, jump_address: Address) {
+        if self.is_jump_condition_met(jump) {
+            self.jump_to(jump_address);
+        }
+    }
+
+
+    /// Read the jump address operand and jump to it if the condition of the given conditional jump is met.
+    #[inline(always)]
+    fn conditional_jump(&mut self, jump: ByteCodes) {
+        let jump_address = self.get_next_address();
+        self.jump_if_condition_met(jump, jump_address);
+    }
+
+
+    fn handle_jump_not_zero(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_NOT_ZERO);
+    }
+
+
+    fn handle_jump_zero(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_ZERO);
+    }
+
+
+    fn handle_jump_greater(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_GREATER);
+    }
+
+
+    fn handle_jump_less(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_LESS);
+    }
+
+
+    fn handle_jump_greater_or_equal(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_GREATER_OR_EQUAL);
+    }
+
+
+    fn handle_jump_less_or_equal(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_LESS_OR_EQUAL);
+    }
+
+
+    fn handle_jump_carry(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_CARRY);
+    }
+
+
+    fn handle_jump_not_carry(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_NOT_CARRY);
+    }
+
+
+    fn handle_jump_overflow(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_OVERFLOW);
+    }
+
+
+    fn handle_jump_not_overflow(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_NOT_OVERFLOW);
+    }
+
+
+    fn handle_jump_sign(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_SIGN);
+    }
+
+
+    fn handle_jump_not_sign(&mut self) {
+        self.conditional_jump(ByteCodes::JUMP_NOT_SIGN);
+    }
+
+
+    fn handle_call(&mut self) {
+        let jump_address = self.get_next_address();
+        self.call(jump_address);
+    }
+
+
+    /// Call the subroutine at the given address
+    #[inline(always)]
+    fn call(&mut self, jump_address: Address) {
+        // Push the return address onto the stack (return address is the current pc)
+        self.push_stack(self.registers.pc() as u64);
+
+        // Jump to the subroutine
+        self.jump_to(jump_address);
+    }
+
+
+    fn handle_return(&mut self) {
+        // Get the return address from the stack
+        let return_address = self.pop_stack(ADDRESS_SIZE as Byte) as Address;
+
+        // Jump to the return address
+        self.jump_to(return_address);
+    }
+
+
+    fn handle_compare_reg_reg(&mut self) {
+        let left_value = self.get_next_reg_operand(8);
+        let right_value = self.get_next_reg_operand(8);
+
+        self.compare(left_value, right_value);
+    }
+
+
+    compare_handlers! {
+        handle_compare_reg_addr_in_reg: reg, addr_in_reg;
+        handle_compare_reg_const: reg, const;
+        handle_compare_reg_addr_literal: reg, addr_literal;
+        handle_compare_addr_in_reg_reg: addr_in_reg, reg;
+        handle_compare_addr_in_reg_addr_in_reg: addr_in_reg, addr_in_reg;
+        handle_compare_addr_in_reg_const: addr_in_reg, const;
+        handle_compare_addr_in_reg_addr_literal: addr_in_reg, addr_literal;
+        handle_compare_const_reg: const, reg;
+        handle_compare_const_addr_in_reg: const, addr_in_reg;
+        handle_compare_const_const: const, const;
+        handle_compare_const_addr_literal: const, addr_literal;
+        handle_compare_addr_literal_reg: addr_literal, reg;
+        handle_compare_addr_literal_addr_in_reg: addr_literal, addr_in_reg;
+        handle_compare_addr_literal_const: addr_literal, const;
+        handle_compare_addr_literal_addr_literal: addr_literal, addr_literal;
+    }
+
+
+    fn handle_and(&mut self) {
+        let result = self.registers.get(Registers::R1) & self.registers.get(Registers::R2);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            false,
+            false
+        );
+    }
+
+
+    fn handle_or(&mut self) {
+        let result = self.registers.get(Registers::R1) | self.registers.get(Registers::R2);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            false,
+            false
+        );
+    }
+
+
+    fn handle_xor(&mut self) {
+        let result = self.registers.get(Registers::R1) ^ self.registers.get(Registers::R2);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            false,
+            true
+        );
+    }
+
+
+    fn handle_not(&mut self) {
+        let result = !self.registers.get(Registers::R1);
+
+        self.registers.set(Registers::R1, result);
+
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            false,
+            true
+        );
+    }
+
+
+    fn handle_shift_left(&mut self) {
+        let value = self.registers.get(Registers::R1);
+        let shift_amount = self.registers.get(Registers::R2);
+
+        let result = value.overflowing_shl(shift_amount as u32).0;
+
+        self.registers.set(Registers::R1, result);
+    }
+
+
+    fn handle_shift_right(&mut self) {
+        let value = self.registers.get(Registers::R1);
+        let shift_amount = self.registers.get(Registers::R2);
+
+        let result = value.overflowing_shr(shift_amount as u32).0;
+
+        self.registers.set(Registers::R1, result);
+    }
+
+
+    fn handle_interrupt_reg(&mut self) {
+        let reg = self.get_next_register();
+        let intr_code = self.registers.get(reg) as u8;
+
+        self.handle_interrupt(intr_code);
+    }
+
 
-                let left_reg = Registers::from(self.get_next_byte());
-                let left_value = self.registers.get(left_reg);
-        
-                let right_address_reg = Registers::from(self.get_next_byte());
-                let right_address = self.registers.get(right_address_reg) as Address;
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_REG_CONST => {
-                let size = self.get_next_byte();
+    fn handle_interrupt_addr_in_reg(&mut self) {
+        let address_reg = self.get_next_register();
+        let address = self.registers.get(address_reg) as Address;
+        let intr_code = self.memory.get_byte(address);
 
-                let left_reg = Registers::from(self.get_next_byte());
-                let left_value = self.registers.get(left_reg);
-        
-                let right_value = bytes_to_int(self.get_next_bytes(size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_REG_ADDR_LITERAL => {
-                let size = self.get_next_byte();
+        self.handle_interrupt(intr_code);
+    }
 
-                let left_reg = Registers::from(self.get_next_byte());
-                let left_value = self.registers.get(left_reg);
-        
-                let right_address = self.get_next_address();
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_IN_REG_REG => {
-                let size = self.get_next_byte();
 
-                let left_address_reg = Registers::from(self.get_next_byte());
-                let left_address = self.registers.get(left_address_reg) as Address;
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-                
-                let right_reg = Registers::from(self.get_next_byte());
-                let right_value = self.registers.get(right_reg);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+    fn handle_interrupt_const(&mut self) {
+        let intr_code = self.get_next_byte();
 
-                let left_address_reg = Registers::from(self.get_next_byte());
-                let left_address = self.registers.get(left_address_reg) as Address;
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-                
-                let right_address_reg = Registers::from(self.get_next_byte());
-                let right_address = self.registers.get(right_address_reg) as Address;
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_IN_REG_CONST => {
-                let size = self.get_next_byte();
+        self.handle_interrupt(intr_code);
+    }
 
-                let left_address_reg = Registers::from(self.get_next_byte());
-                let left_address = self.registers.get(left_address_reg) as Address;
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-               
-                let right_value = bytes_to_int(self.get_next_bytes(size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_LITERAL => {
-                let size = self.get_next_byte();
 
-                let left_address_reg = Registers::from(self.get_next_byte());
-                let left_address = self.registers.get(left_address_reg) as Address;
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-               
-                let right_address = self.get_next_address();
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_CONST_REG => {
-                let size = self.get_next_byte();
+    fn handle_interrupt_addr_literal(&mut self) {
+        let address = self.get_next_address();
+        let intr_code = self.memory.get_byte(address);
 
-                let left_address = self.get_next_bytes(size as usize);
-                let left_value = bytes_to_int(left_address, size);
-        
-                let right_reg = Registers::from(self.get_next_byte());
-                let right_value = self.registers.get(right_reg);
-                
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_CONST_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+        self.handle_interrupt(intr_code);
+    }
 
-                let left_address = self.get_next_bytes(size as usize);
-                let left_value = bytes_to_int(left_address, size);
-        
-                let right_address_reg = Registers::from(self.get_next_byte());
-                let right_address = self.registers.get(right_address_reg) as Address;
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_CONST_CONST => {
-                let size = self.get_next_byte();
 
-                let left_address = self.get_next_bytes(size as usize);
-                let left_value = bytes_to_int(left_address, size);
-        
-                let right_address = self.get_next_bytes(size as usize);
-                let right_value = bytes_to_int(right_address, size);
-                
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_CONST_ADDR_LITERAL => {
-                let size = self.get_next_byte();
+    fn handle_exit(&mut self) {
+        self.exit();
+    }
 
-                let left_address = self.get_next_bytes(size as usize);
-                let left_value = bytes_to_int(left_address, size);
-        
-                let right_address = self.get_next_address();
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64), 
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_LITERAL_REG => {
-                let size = self.get_next_byte();
 
-                let left_address = self.get_next_address();
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-        
-                let right_reg = Registers::from(self.get_next_byte());
-                let right_value = self.registers.get(right_reg);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64), 
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_IN_REG => {
-                let size = self.get_next_byte();
+    /// Terminate the program with the exit code in the exit register.
+    /// This is the only way a program stops, so the run loops never return.
+    #[cold]
+    fn exit(&mut self) -> ! {
+        let exit_code_n = self.registers.get(Registers::EXIT) as u8;
+        let exit_code = ErrorCodes::from(exit_code_n);
 
-                let left_address = self.get_next_address();
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-        
-                let right_address_reg = Registers::from(self.get_next_byte());
-                let right_address = self.registers.get(right_address_reg) as Address;
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-        
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64), 
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_LITERAL_CONST => {
-                let size = self.get_next_byte();
+        if !self.quiet_exit {
+            println!("Program exited with code {} ({})", exit_code_n, exit_code);
+        }
 
-                let left_address = self.get_next_address();
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-        
-                let right_address = self.get_next_bytes(size as usize);
-                let right_value = bytes_to_int(right_address, size);
-                
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64), 
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_LITERAL => {
-                let size = self.get_next_byte();
+        std::process::exit(exit_code as i32);
+    }
 
-                let left_address = self.get_next_address();
-                let left_value = bytes_to_int(self.memory.get_bytes(left_address, size as usize), size);
-        
-                let right_address = self.get_next_address();
-                let right_value = bytes_to_int(self.memory.get_bytes(right_address, size as usize), size);
-                
-                let result = left_value as i64 - right_value as i64;
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result as u64), 
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::AND => {
-                let result = self.registers.get(Registers::R1) & self.registers.get(Registers::R2);
 
-                self.registers.set(Registers::R1, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::OR => {
-                let result = self.registers.get(Registers::R1) | self.registers.get(Registers::R2);
+    #[cold]
+    fn handle_invalid_opcode(&mut self) {
+        let opcode = self.memory.get_byte(self.registers.pc() - 1);
+        error::error(format!("Invalid byte code: {}", opcode).as_str());
+    }
 
-                self.registers.set(Registers::R1, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    false,
-                    false
-                );
-            },
-            
-            ByteCodes::XOR => {
-                let result = self.registers.get(Registers::R1) ^ self.registers.get(Registers::R2);
 
-                self.registers.set(Registers::R1, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    false,
-                    true
-                );
-            },
-            
-            ByteCodes::NOT => {
-                let result = !self.registers.get(Registers::R1);
+    /// Return the handler function of the given instruction
+    const fn instruction_handler(opcode: ByteCodes) -> InstructionHandler {
+        match opcode {
+            ByteCodes::INTEGER_ADD => Self::handle_integer_add,
+            ByteCodes::INTEGER_SUB => Self::handle_integer_sub,
+            ByteCodes::INTEGER_MUL => Self::handle_integer_mul,
+            ByteCodes::INTEGER_DIV => Self::handle_integer_div,
+            ByteCodes::INTEGER_MOD => Self::handle_integer_mod,
+            ByteCodes::FLOAT_ADD => Self::handle_float_add,
+            ByteCodes::FLOAT_SUB => Self::handle_float_sub,
+            ByteCodes::FLOAT_MUL => Self::handle_float_mul,
+            ByteCodes::FLOAT_DIV => Self::handle_float_div,
+            ByteCodes::FLOAT_MOD => Self::handle_float_mod,
+            ByteCodes::INC_REG => Self::handle_inc_reg,
+            ByteCodes::INC_ADDR_IN_REG => Self::handle_inc_addr_in_reg,
+            ByteCodes::INC_ADDR_LITERAL => Self::handle_inc_addr_literal,
+            ByteCodes::DEC_REG => Self::handle_dec_reg,
+            ByteCodes::DEC_ADDR_IN_REG => Self::handle_dec_addr_in_reg,
+            ByteCodes::DEC_ADDR_LITERAL => Self::handle_dec_addr_literal,
+            ByteCodes::NO_OPERATION => Self::handle_no_operation,
+            ByteCodes::MOVE_INTO_REG_FROM_REG => Self::handle_move_into_reg_from_reg,
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG => Self::handle_move_into_reg_from_addr_in_reg,
+            ByteCodes::MOVE_INTO_REG_FROM_CONST => Self::handle_move_into_reg_from_const,
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL => Self::handle_move_into_reg_from_addr_literal,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_REG => Self::handle_move_into_addr_in_reg_from_reg,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_IN_REG => Self::handle_move_into_addr_in_reg_from_addr_in_reg,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_CONST => Self::handle_move_into_addr_in_reg_from_const,
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_LITERAL => Self::handle_move_into_addr_in_reg_from_addr_literal,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_REG => Self::handle_move_into_addr_literal_from_reg,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_IN_REG => Self::handle_move_into_addr_literal_from_addr_in_reg,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_CONST => Self::handle_move_into_addr_literal_from_const,
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL => Self::handle_move_into_addr_literal_from_addr_literal,
+            ByteCodes::PUSH_FROM_REG => Self::handle_push_from_reg,
+            ByteCodes::PUSH_FROM_ADDR_IN_REG => Self::handle_push_from_addr_in_reg,
+            ByteCodes::PUSH_FROM_CONST => Self::handle_push_from_const,
+            ByteCodes::PUSH_FROM_ADDR_LITERAL => Self::handle_push_from_addr_literal,
+            ByteCodes::PUSH_STACK_POINTER_REG => Self::handle_push_stack_pointer_reg,
+            ByteCodes::PUSH_STACK_POINTER_ADDR_IN_REG => Self::handle_push_stack_pointer_addr_in_reg,
+            ByteCodes::PUSH_STACK_POINTER_CONST => Self::handle_push_stack_pointer_const,
+            ByteCodes::PUSH_STACK_POINTER_ADDR_LITERAL => Self::handle_push_stack_pointer_addr_literal,
+            ByteCodes::POP_INTO_REG => Self::handle_pop_into_reg,
+            ByteCodes::POP_INTO_ADDR_IN_REG => Self::handle_pop_into_addr_in_reg,
+            ByteCodes::POP_INTO_ADDR_LITERAL => Self::handle_pop_into_addr_literal,
+            ByteCodes::POP_STACK_POINTER_REG => Self::handle_pop_stack_pointer_reg,
+            ByteCodes::POP_STACK_POINTER_ADDR_IN_REG => Self::handle_pop_stack_pointer_addr_in_reg,
+            ByteCodes::POP_STACK_POINTER_CONST => Self::handle_pop_stack_pointer_const,
+            ByteCodes::POP_STACK_POINTER_ADDR_LITERAL => Self::handle_pop_stack_pointer_addr_literal,
+            ByteCodes::LABEL => Self::handle_label,
+            ByteCodes::JUMP => Self::handle_jump,
+            ByteCodes::JUMP_NOT_ZERO => Self::handle_jump_not_zero,
+            ByteCodes::JUMP_ZERO => Self::handle_jump_zero,
+            ByteCodes::JUMP_GREATER => Self::handle_jump_greater,
+            ByteCodes::JUMP_LESS => Self::handle_jump_less,
+            ByteCodes::JUMP_GREATER_OR_EQUAL => Self::handle_jump_greater_or_equal,
+            ByteCodes::JUMP_LESS_OR_EQUAL => Self::handle_jump_less_or_equal,
+            ByteCodes::JUMP_CARRY => Self::handle_jump_carry,
+            ByteCodes::JUMP_NOT_CARRY => Self::handle_jump_not_carry,
+            ByteCodes::JUMP_OVERFLOW => Self::handle_jump_overflow,
+            ByteCodes::JUMP_NOT_OVERFLOW => Self::handle_jump_not_overflow,
+            ByteCodes::JUMP_SIGN => Self::handle_jump_sign,
+            ByteCodes::JUMP_NOT_SIGN => Self::handle_jump_not_sign,
+            ByteCodes::CALL => Self::handle_call,
+            ByteCodes::RETURN => Self::handle_return,
+            ByteCodes::COMPARE_REG_REG => Self::handle_compare_reg_reg,
+            ByteCodes::COMPARE_REG_ADDR_IN_REG => Self::handle_compare_reg_addr_in_reg,
+            ByteCodes::COMPARE_REG_CONST => Self::handle_compare_reg_const,
+            ByteCodes::COMPARE_REG_ADDR_LITERAL => Self::handle_compare_reg_addr_literal,
+            ByteCodes::COMPARE_ADDR_IN_REG_REG => Self::handle_compare_addr_in_reg_reg,
+            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_IN_REG => Self::handle_compare_addr_in_reg_addr_in_reg,
+            ByteCodes::COMPARE_ADDR_IN_REG_CONST => Self::handle_compare_addr_in_reg_const,
+            ByteCodes::COMPARE_ADDR_IN_REG_ADDR_LITERAL => Self::handle_compare_addr_in_reg_addr_literal,
+            ByteCodes::COMPARE_CONST_REG => Self::handle_compare_const_reg,
+            ByteCodes::COMPARE_CONST_ADDR_IN_REG => Self::handle_compare_const_addr_in_reg,
+            ByteCodes::COMPARE_CONST_CONST => Self::handle_compare_const_const,
+            ByteCodes::COMPARE_CONST_ADDR_LITERAL => Self::handle_compare_const_addr_literal,
+            ByteCodes::COMPARE_ADDR_LITERAL_REG => Self::handle_compare_addr_literal_reg,
+            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_IN_REG => Self::handle_compare_addr_literal_addr_in_reg,
+            ByteCodes::COMPARE_ADDR_LITERAL_CONST => Self::handle_compare_addr_literal_const,
+            ByteCodes::COMPARE_ADDR_LITERAL_ADDR_LITERAL => Self::handle_compare_addr_literal_addr_literal,
+            ByteCodes::AND => Self::handle_and,
+            ByteCodes::OR => Self::handle_or,
+            ByteCodes::XOR => Self::handle_xor,
+            ByteCodes::NOT => Self::handle_not,
+            ByteCodes::SHIFT_LEFT => Self::handle_shift_left,
+            ByteCodes::SHIFT_RIGHT => Self::handle_shift_right,
+            ByteCodes::INTERRUPT_REG => Self::handle_interrupt_reg,
+            ByteCodes::INTERRUPT_ADDR_IN_REG => Self::handle_interrupt_addr_in_reg,
+            ByteCodes::INTERRUPT_CONST => Self::handle_interrupt_const,
+            ByteCodes::INTERRUPT_ADDR_LITERAL => Self::handle_interrupt_addr_literal,
+            ByteCodes::EXIT => Self::handle_exit,
+        }
+    }
 
-                self.registers.set(Registers::R1, result);
-        
-                self.set_arithmetical_flags(
-                    result == 0,
-                    is_msb_set(result),
-                    0,
-                    false,
-                    true
-                );
-            },
-            
-            ByteCodes::SHIFT_LEFT => {
-                let value = self.registers.get(Registers::R1);
-                let shift_amount = self.registers.get(Registers::R2);
-        
-                let result = value.overflowing_shl(shift_amount as u32).0;
-        
-                self.registers.set(Registers::R1, result);
-            },
-            
-            ByteCodes::SHIFT_RIGHT => {
-                let value = self.registers.get(Registers::R1);
-                let shift_amount = self.registers.get(Registers::R2);
-        
-                let result = value.overflowing_shr(shift_amount as u32).0;
-        
-                self.registers.set(Registers::R1, result);
-            },
-            
-            ByteCodes::INTERRUPT_REG => {
-                let reg = Registers::from(self.get_next_byte());
-                let intr_code = self.registers.get(reg) as u8;
-        
-                self.handle_interrupt(intr_code);
-            },
-            
-            ByteCodes::INTERRUPT_ADDR_IN_REG => {
-                let address_reg = Registers::from(self.get_next_byte());
-                let address = self.registers.get(address_reg) as Address;
-                let intr_code = bytes_to_int(self.memory.get_bytes(address, 1), 1) as u8;
-        
-                self.handle_interrupt(intr_code);
-            },
-            
-            ByteCodes::INTERRUPT_CONST => {
-                let intr_code = self.get_next_byte();
 
-                self.handle_interrupt(intr_code);
-            },
-            
-            ByteCodes::INTERRUPT_ADDR_LITERAL => {
-                let address = self.get_next_address();
-                let intr_code = bytes_to_int(self.memory.get_bytes(address, 1), 1) as u8;
-        
-                self.handle_interrupt(intr_code);
-            },
-            
-            ByteCodes::EXIT => {
-                let exit_code_n = self.registers.get(Registers::EXIT) as u8;
-                let exit_code = ErrorCodes::from(exit_code_n);
-        
-                if !self.quiet_exit {
-                    println!("Program exited with code {} ({})", exit_code_n, exit_code);
-                }
-                
-                std::process::exit(exit_code as i32);
-            },
+    /// Opcode-indexed table of the instruction handlers.
+    /// 
+    /// The table has an entry for every possible byte value, so indexing it with a raw opcode never needs a bounds check
+    /// or a conversion into `ByteCodes`. Unused opcodes are mapped to `handle_invalid_opcode`.
+    const INSTRUCTION_HANDLERS: [InstructionHandler; 256] = {
+        let mut table = [Self::handle_invalid_opcode as InstructionHandler; 256];
+
+        let mut opcode = 0;
+        while opcode < BYTE_CODE_COUNT {
+            // Safety: every value below `BYTE_CODE_COUNT` is a valid `ByteCodes` discriminant
+            table[opcode] = Self::instruction_handler(unsafe { mem::transmute::<u8, ByteCodes>(opcode as u8) });
+            opcode += 1;
         }
+
+        table
+    };
+
+
+    /// Execute the instruction with the given raw opcode
+    #[inline(always)]
+    fn handle_instruction(&mut self, opcode: Byte) {
+        Self::INSTRUCTION_HANDLERS[opcode as usize](self);
     }
 
 
     /// Set the arithmetical flags
+    /// 
+    /// The flags are stored together as a single block instead of five separate register writes.
+    /// Handlers compute the flags with `overflowing_*` operations and `bool as u64` conversions, so setting them doesn't branch.
+    #[inline(always)]
     fn set_arithmetical_flags(&mut self, zf: bool, sf: bool, rf: u64, cf: bool, of: bool) {
-        self.registers.set(Registers::ZERO_FLAG, zf as u64);
-        self.registers.set(Registers::SIGN_FLAG, sf as u64);
-        self.registers.set(Registers::REMAINDER_FLAG, rf);
-        self.registers.set(Registers::CARRY_FLAG, cf as u64);
-        self.registers.set(Registers::OVERFLOW_FLAG, of as u64);
+        self.registers.set_arithmetical_flags([zf as u64, sf as u64, rf, cf as u64, of as u64]);
     }
 
 
+    /// Set the arithmetical flags from the wrapped result of an integer operation, whether it carried as an unsigned
+    /// operation and whether it overflowed as a signed one, the same way `compare` does for the subtraction.
+    /// Shared by the integer arithmetic instructions and by all the variants of `inc` and `dec`, which wrap around on overflow.
+    #[inline(always)]
+    fn set_integer_flags(&mut self, result: u64, carry: bool, overflow: bool) {
+        self.set_arithmetical_flags(
+            result == 0,
+            is_msb_set(result),
+            0,
+            carry,
+            overflow
+        );
+    }
+
+
+    /// Interrupts are dominated by host I/O, so they're never inlined into the instruction handlers
+    #[inline(never)]
     fn handle_interrupt(&mut self, intr_code: u8) {
 
         match Interrupts::from(intr_code) {
 
             Interrupts::PrintSigned => {
                 let value = self.registers.get(Registers::PRINT);
-                print!("{}", value as i64);
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                write!(stdout, "{}", value as i64).expect("Failed to write to stdout");
             },
 
             Interrupts::PrintUnsigned => {
                 let value = self.registers.get(Registers::PRINT);
-                print!("{}", value);
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                write!(stdout, "{}", value).expect("Failed to write to stdout");
             },
 
             Interrupts::PrintFloat => {
                 let value = self.registers.get(Registers::PRINT);
-                print!("{}", value as f64);
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                write!(stdout, "{}", value as f64).expect("Failed to write to stdout");
             }
 
             Interrupts::PrintChar => {
                 let value = self.registers.get(Registers::PRINT);
-                io::stdout().write_all(&[value as u8]).expect("Failed to write to stdout");
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                stdout.write_all(&[value as u8]).expect("Failed to write to stdout");
             },
 
             Interrupts::PrintString => {
@@ -1622,8 +2000,8 @@ impl Processor {
                 let length = self.strlen(string_address);
                 let bytes = self.memory.get_bytes(string_address, length);
 
-                io::stdout().write_all(bytes).expect("Failed to write to stdout");
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                stdout.write_all(bytes).expect("Failed to write to stdout");
             },
 
             Interrupts::PrintBytes => {
@@ -1631,11 +2009,13 @@ impl Processor {
                 let length = self.registers.get(Registers::R1) as usize;
                 let bytes = self.memory.get_bytes(bytes_address, length);
 
-                io::stdout().write_all(bytes).expect("Failed to write to stdout");
-                io::stdout().flush().expect("Failed to flush stdout");
+                let mut stdout = io::stdout().lock();
+                stdout.write_all(bytes).expect("Failed to write to stdout");
             },
 
             Interrupts::InputSignedInt => {
+                flush_stdout();
+
                 let mut input = String::new();
 
                 match io::stdin().read_line(&mut input) {
@@ -1664,6 +2044,8 @@ impl Processor {
             },
 
             Interrupts::InputUnsignedInt => {
+                flush_stdout();
+
                 let mut input = String::new();
 
                 match io::stdin().read_line(&mut input) {
@@ -1692,7 +2074,8 @@ impl Processor {
             },
 
             Interrupts::InputString => {
-                
+                flush_stdout();
+
                 let buf_addr = self.registers.get(Registers::R1) as Address;
                 let size = self.registers.get(Registers::R2) as usize;
                     
@@ -1778,6 +2161,8 @@ impl Processor {
             },
 
             Interrupts::Terminal => {
+                flush_stdout();
+
                 let term_code = self.registers.get(Registers::PRINT); 
 
                 let err = self.modules.terminal.handle_code(term_code as usize, &mut self.registers, &mut self.memory);
@@ -1787,15 +2172,18 @@ impl Processor {
             Interrupts::SetTimerNanos => {
                 let time = self.registers.get(Registers::R1);
                 let duration = std::time::Duration::from_nanos(time);
-        
+
+                flush_stdout();
                 std::thread::sleep(duration);
             },
 
             Interrupts::FlushStdout => {
-                io::stdout().flush().expect("Failed to flush stdout");
+                flush_stdout();
             },
 
             Interrupts::HostFs => {
+                flush_stdout();
+
                 let fs_code = self.registers.get(Registers::PRINT);
 
                 let err = self.modules.host_fs.handle_code(fs_code as usize, &mut self.registers, &mut self.memory);
@@ -1807,3 +2195,454 @@ impl Processor {
 
 }
 
+
+
+#[cfg(test)]
+mod tests {
+
+    use super::*;
+
+    const MEMORY_SIZE: usize = 1024;
+    /// Address of the data the test instructions operate on
+    const DATA_ADDRESS: Address = 512;
+    /// Free stack space below the stack base
+    const STACK_SPACE: usize = 64;
+
+
+    /// Create a processor with the given bytecode loaded at the start of memory and the pc pointing to it.
+    /// The data area holds the bytes 0, 1, 2, ..., and there is some free space on the stack.
+    fn test_processor(code: &[Byte]) -> Processor {
+        let mut processor = Processor::new(MEMORY_SIZE, true, None);
+        processor.memory.set_bytes(Processor::STATIC_PROGRAM_ADDRESS, code);
+        processor.memory.set_bytes(DATA_ADDRESS, &(0..64).collect::<Vec<Byte>>());
+        processor.registers.set(Registers::STACK_TOP_POINTER, (processor.memory.get_stack_base() - STACK_SPACE) as u64);
+        processor
+    }
+
+
+    /// Execute the instructions one at a time through their generic handlers, until the pc leaves the given code
+    fn step(processor: &mut Processor, code_size: usize) {
+        while processor.registers.pc() < code_size {
+            let opcode = processor.get_next_byte();
+            processor.handle_instruction(opcode);
+        }
+    }
+
+
+    /// Decode the basic block at the pc and execute it
+    fn run_block(processor: &mut Processor, code_size: usize) -> Box<[DecodedInstruction]> {
+        let block = processor.decode_block(processor.registers.pc(), code_size);
+        for &instruction in block.iter() {
+            processor.execute_decoded_instruction(instruction);
+        }
+        block
+    }
+
+
+    /// Return the bytecode of a move of `size` bytes between two address literals
+    fn memory_copy(size: Byte, dest_address: Address, src_address: Address) -> Vec<Byte> {
+        [&[ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL as Byte, size][..], &dest_address.to_le_bytes(), &src_address.to_le_bytes()].concat()
+    }
+
+
+    /// Return operands of the given instruction that its handler can execute in a test processor.
+    /// 
+    /// Register operands are R2, which holds an interrupt code, and address-in-register operands are R3, which holds the
+    /// address of the data. Sizes are 8 bytes and jumps target the address right after them, assuming they're at address 0.
+    fn test_operands(instruction: ByteCodes) -> Vec<Byte> {
+
+        let size = [8];
+        let reg = [Registers::R2 as Byte];
+        let addr_in_reg = [Registers::R3 as Byte];
+        let constant = 1u64.to_le_bytes();
+        let addr_literal = DATA_ADDRESS.to_le_bytes();
+        let jump_address = (1 + ADDRESS_SIZE).to_le_bytes();
+        let interrupt_code = [Interrupts::FlushStdout as Byte];
+
+        match instruction {
+
+            ByteCodes::INTEGER_ADD
+            | ByteCodes::INTEGER_SUB
+            | ByteCodes::INTEGER_MUL
+            | ByteCodes::INTEGER_DIV
+            | ByteCodes::INTEGER_MOD
+            | ByteCodes::FLOAT_ADD
+            | ByteCodes::FLOAT_SUB
+            | ByteCodes::FLOAT_MUL
+            | ByteCodes::FLOAT_DIV
+            | ByteCodes::FLOAT_MOD
+            | ByteCodes::NO_OPERATION
+            | ByteCodes::LABEL
+            | ByteCodes::RETURN
+            | ByteCodes::AND
+            | ByteCodes::OR
+            | ByteCodes::XOR
+            | ByteCodes::NOT
+            | ByteCodes::SHIFT_LEFT
+            | ByteCodes::SHIFT_RIGHT
+            | ByteCodes::EXIT
+                => vec![],
+
+            ByteCodes::INC_REG
+            | ByteCodes::DEC_REG
+            | ByteCodes::PUSH_FROM_REG
+            | ByteCodes::PUSH_STACK_POINTER_REG
+            | ByteCodes::POP_STACK_POINTER_REG
+            | ByteCodes::INTERRUPT_REG
+                => reg.to_vec(),
+
+            ByteCodes::INTERRUPT_ADDR_IN_REG => addr_in_reg.to_vec(),
+            ByteCodes::INTERRUPT_CONST => interrupt_code.to_vec(),
+            ByteCodes::INTERRUPT_ADDR_LITERAL => addr_literal.to_vec(),
+
+            ByteCodes::JUMP
+            | ByteCodes::JUMP_NOT_ZERO
+            | ByteCodes::JUMP_ZERO
+            | ByteCodes::JUMP_GREATER
+            | ByteCodes::JUMP_LESS
+            | ByteCodes::JUMP_GREATER_OR_EQUAL
+            | ByteCodes::JUMP_LESS_OR_EQUAL
+            | ByteCodes::JUMP_CARRY
+            | ByteCodes::JUMP_NOT_CARRY
+            | ByteCodes::JUMP_OVERFLOW
+            | ByteCodes::JUMP_NOT_OVERFLOW
+            | ByteCodes::JUMP_SIGN
+            | ByteCodes::JUMP_NOT_SIGN
+            | ByteCodes::CALL
+                => jump_address.to_vec(),
+
+            ByteCodes::MOVE_INTO_REG_FROM_REG
+            | ByteCodes::COMPARE_REG_REG
+                => [&reg[..], &reg].concat(),
+
+            ByteCodes::INC_ADDR_IN_REG
+            | ByteCodes::DEC_ADDR_IN_REG
+            | ByteCodes::PUSH_FROM_ADDR_IN_REG
+            | ByteCodes::PUSH_STACK_POINTER_ADDR_IN_REG
+            | ByteCodes::POP_INTO_ADDR_IN_REG
+            | ByteCodes::POP_STACK_POINTER_ADDR_IN_REG
+                => [&size[..], &addr_in_reg].concat(),
+
+            ByteCodes::POP_INTO_REG => [&size[..], &reg].concat(),
+
+            ByteCodes::INC_ADDR_LITERAL
+            | ByteCodes::DEC_ADDR_LITERAL
+            | ByteCodes::PUSH_FROM_ADDR_LITERAL
+            | ByteCodes::PUSH_STACK_POINTER_ADDR_LITERAL
+            | ByteCodes::POP_INTO_ADDR_LITERAL
+            | ByteCodes::POP_STACK_POINTER_ADDR_LITERAL
+                => [&size[..], &addr_literal].concat(),
+
+            ByteCodes::PUSH_FROM_CONST
+            | ByteCodes::PUSH_STACK_POINTER_CONST
+            | ByteCodes::POP_STACK_POINTER_CONST
+                => [&size[..], &constant].concat(),
+
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG
+            | ByteCodes::COMPARE_REG_ADDR_IN_REG
+                => [&size[..], &reg, &addr_in_reg].concat(),
+            ByteCodes::MOVE_INTO_REG_FROM_CONST
+            | ByteCodes::COMPARE_REG_CONST
+                => [&size[..], &reg, &constant].concat(),
+            ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL
+            | ByteCodes::COMPARE_REG_ADDR_LITERAL
+                => [&size[..], &reg, &addr_literal].concat(),
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_REG
+            | ByteCodes::COMPARE_ADDR_IN_REG_REG
+                => [&size[..], &addr_in_reg, &reg].concat(),
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_IN_REG
+            | ByteCodes::COMPARE_ADDR_IN_REG_ADDR_IN_REG
+                => [&size[..], &addr_in_reg, &addr_in_reg].concat(),
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_CONST
+            | ByteCodes::COMPARE_ADDR_IN_REG_CONST
+                => [&size[..], &addr_in_reg, &constant].concat(),
+            ByteCodes::MOVE_INTO_ADDR_IN_REG_FROM_ADDR_LITERAL
+            | ByteCodes::COMPARE_ADDR_IN_REG_ADDR_LITERAL
+                => [&size[..], &addr_in_reg, &addr_literal].concat(),
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_REG
+            | ByteCodes::COMPARE_ADDR_LITERAL_REG
+                => [&size[..], &addr_literal, &reg].concat(),
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_IN_REG
+            | ByteCodes::COMPARE_ADDR_LITERAL_ADDR_IN_REG
+                => [&size[..], &addr_literal, &addr_in_reg].concat(),
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_CONST
+            | ByteCodes::COMPARE_ADDR_LITERAL_CONST
+                => [&size[..], &addr_literal, &constant].concat(),
+            ByteCodes::MOVE_INTO_ADDR_LITERAL_FROM_ADDR_LITERAL
+            | ByteCodes::COMPARE_ADDR_LITERAL_ADDR_LITERAL
+                => [&size[..], &addr_literal, &addr_literal].concat(),
+
+            ByteCodes::COMPARE_CONST_REG => [&size[..], &constant, &reg].concat(),
+            ByteCodes::COMPARE_CONST_ADDR_IN_REG => [&size[..], &constant, &addr_in_reg].concat(),
+            ByteCodes::COMPARE_CONST_CONST => [&size[..], &constant, &constant].concat(),
+            ByteCodes::COMPARE_CONST_ADDR_LITERAL => [&size[..], &constant, &addr_literal].concat(),
+        }
+    }
+
+
+    #[test]
+    fn test_instruction_size() {
+        for opcode in 0..BYTE_CODE_COUNT as Byte {
+            let instruction = ByteCodes::from(opcode);
+            let code = [&[opcode][..], &test_operands(instruction)].concat();
+
+            let mut processor = test_processor(&code);
+            assert_eq!(processor.instruction_size(0), code.len(), "{}", instruction);
+
+            // Exit never returns and labels are never emitted in the bytecode
+            if matches!(instruction, ByteCodes::EXIT | ByteCodes::LABEL) {
+                continue;
+            }
+
+            // The handler must read exactly the operands counted by `instruction_size`
+            processor.registers.set(Registers::R2, Interrupts::FlushStdout as u64);
+            processor.registers.set(Registers::R3, DATA_ADDRESS as u64);
+            processor.memory.set_array(DATA_ADDRESS, (Interrupts::FlushStdout as u64).to_le_bytes());
+            // The return address of `ret`
+            processor.push_stack(code.len() as u64);
+
+            step(&mut processor, code.len());
+            assert_eq!(processor.registers.pc(), code.len(), "{}", instruction);
+        }
+    }
+
+
+    #[test]
+    fn test_block_ends_at_write_into_pc() {
+        let r1 = Registers::R1 as Byte;
+        let inc_r1 = [ByteCodes::INC_REG as Byte, r1];
+
+        let writes_into = |dest_reg: Registers| -> [Vec<Byte>; 7] {
+            let dest_reg = dest_reg as Byte;
+            [
+                vec![ByteCodes::MOVE_INTO_REG_FROM_REG as Byte, dest_reg, r1],
+                vec![ByteCodes::MOVE_INTO_REG_FROM_ADDR_IN_REG as Byte, 8, dest_reg, r1],
+                [&[ByteCodes::MOVE_INTO_REG_FROM_CONST as Byte, 8, dest_reg][..], &0u64.to_le_bytes()].concat(),
+                [&[ByteCodes::MOVE_INTO_REG_FROM_ADDR_LITERAL as Byte, 8, dest_reg][..], &DATA_ADDRESS.to_le_bytes()].concat(),
+                vec![ByteCodes::POP_INTO_REG as Byte, 8, dest_reg],
+                vec![ByteCodes::INC_REG as Byte, dest_reg],
+                vec![ByteCodes::DEC_REG as Byte, dest_reg],
+            ]
+        };
+
+        for instruction in writes_into(Registers::PROGRAM_COUNTER) {
+            let code = [&inc_r1[..], &instruction, &inc_r1].concat();
+            let block = test_processor(&code).decode_block(0, code.len());
+
+            assert_eq!(block.len(), 2, "{:?}", instruction);
+        }
+
+        for instruction in writes_into(Registers::R2) {
+            let code = [&inc_r1[..], &instruction, &inc_r1].concat();
+            let block = test_processor(&code).decode_block(0, code.len());
+
+            assert_eq!(block.len(), 3, "{:?}", instruction);
+            assert_eq!(block[2].next_pc, code.len(), "{:?}", instruction);
+        }
+    }
+
+
+    /// Return the arithmetical flags, from the zero flag to the overflow flag
+    fn arithmetical_flags(processor: &Processor) -> Vec<u64> {
+        processor.registers.iter().skip(Registers::ZERO_FLAG as usize).copied().collect()
+    }
+
+
+    #[test]
+    fn test_compare_flags() {
+        let r1 = Registers::R1 as Byte;
+        let r2 = Registers::R2 as Byte;
+
+        // (left, right, conditional jump, whether it's taken, carry flag, overflow flag)
+        let cases = [
+            // The signed subtraction overflows, but the left value is still less
+            (i64::MIN as u64, 1, ByteCodes::JUMP_LESS, true, 0, 1),
+            // The unsigned subtraction borrows
+            (0, 1, ByteCodes::JUMP_GREATER_OR_EQUAL, false, 1, 0),
+        ];
+
+        for (left, right, jump, taken, carry, overflow) in cases {
+            let jump_address = 2 + 1 + ADDRESS_SIZE + 8;
+            let code = [&[ByteCodes::COMPARE_REG_REG as Byte, r1, r2, jump as Byte][..], &jump_address.to_le_bytes()].concat();
+
+            let mut stepped = test_processor(&code);
+            stepped.registers.set(Registers::R1, left);
+            stepped.registers.set(Registers::R2, right);
+            step(&mut stepped, code.len());
+
+            let mut decoded = test_processor(&code);
+            decoded.registers.set(Registers::R1, left);
+            decoded.registers.set(Registers::R2, right);
+            run_block(&mut decoded, code.len());
+
+            let mut subtracted = test_processor(&[ByteCodes::INTEGER_SUB as Byte]);
+            subtracted.registers.set(Registers::R1, left);
+            subtracted.registers.set(Registers::R2, right);
+            step(&mut subtracted, 1);
+
+            for processor in [&stepped, &decoded] {
+                assert_eq!(processor.registers.get(Registers::CARRY_FLAG), carry, "{} {}", left, right);
+                assert_eq!(processor.registers.get(Registers::OVERFLOW_FLAG), overflow, "{} {}", left, right);
+                assert_eq!(processor.registers.pc(), if taken { jump_address } else { code.len() }, "{} {}", left, right);
+                assert_eq!(arithmetical_flags(processor), arithmetical_flags(&subtracted), "{} {}", left, right);
+            }
+        }
+    }
+
+
+    #[test]
+    fn test_inc_dec_wrap_around() {
+        let r1 = Registers::R1 as Byte;
+
+        // (instruction, initial value, wrapped result, flags from zero to overflow)
+        let cases = [
+            (ByteCodes::INC_REG, u64::MAX, 0, [1, 0, 0, 1, 0]),
+            (ByteCodes::DEC_REG, 0, u64::MAX, [0, 1, 0, 1, 0]),
+        ];
+
+        for (instruction, value, result, flags) in cases {
+            let code = [instruction as Byte, r1];
+
+            let mut stepped = test_processor(&code);
+            stepped.registers.set(Registers::R1, value);
+            step(&mut stepped, code.len());
+
+            let mut decoded = test_processor(&code);
+            decoded.registers.set(Registers::R1, value);
+            run_block(&mut decoded, code.len());
+
+            for processor in [&stepped, &decoded] {
+                assert_eq!(processor.registers.get(Registers::R1), result, "{}", instruction);
+                assert_eq!(arithmetical_flags(processor), flags, "{}", instruction);
+            }
+        }
+    }
+
+
+    #[test]
+    fn test_fused_conditional_jumps() {
+        let r1 = Registers::R1 as Byte;
+        let r2 = Registers::R2 as Byte;
+        let pc = Registers::PROGRAM_COUNTER as Byte;
+
+        // Flag-setting instructions, with whether they get fused with the jump.
+        // The generic handlers read the pc in the middle of the compare operands, so compares of the pc are left to them.
+        let flag_setters: [(Vec<Byte>, bool); 7] = [
+            (vec![ByteCodes::INC_REG as Byte, r1], true),
+            (vec![ByteCodes::DEC_REG as Byte, r1], true),
+            (vec![ByteCodes::COMPARE_REG_REG as Byte, r1, r2], true),
+            ([&[ByteCodes::COMPARE_REG_CONST as Byte, 8, r1][..], &0u64.to_le_bytes()].concat(), true),
+            (vec![ByteCodes::COMPARE_REG_REG as Byte, pc, r2], false),
+            (vec![ByteCodes::COMPARE_REG_REG as Byte, r2, pc], false),
+            ([&[ByteCodes::COMPARE_REG_CONST as Byte, 8, pc][..], &3u64.to_le_bytes()].concat(), false),
+        ];
+
+        for (flag_setter, fused) in flag_setters {
+            for jump in [ByteCodes::JUMP_ZERO, ByteCodes::JUMP_NOT_ZERO] {
+                // Jump past the end of the code, so that stepping stops there
+                let jump_address = flag_setter.len() + 1 + ADDRESS_SIZE + 8;
+                let code = [&flag_setter[..], &[jump as Byte], &jump_address.to_le_bytes()].concat();
+
+                // R2 holds the pc the generic handler reads as the left operand of `cmp pc, r2`
+                let mut stepped = test_processor(&code);
+                stepped.registers.set(Registers::R2, 2);
+                step(&mut stepped, code.len());
+
+                let mut decoded = test_processor(&code);
+                decoded.registers.set(Registers::R2, 2);
+                let block = run_block(&mut decoded, code.len());
+
+                assert_eq!(block.len(), if fused { 1 } else { 2 }, "{:?} {}", flag_setter, jump);
+                assert!(decoded.registers.iter().eq(stepped.registers.iter()), "{:?} {}", flag_setter, jump);
+            }
+        }
+    }
+
+
+    #[test]
+    fn test_no_operations_in_blocks() {
+        let nop = ByteCodes::NO_OPERATION as Byte;
+        let r1 = Registers::R1 as Byte;
+        // Address of the second block
+        const TARGET: Address = 39;
+
+        let code = [
+            // First block
+            &[nop][..],
+            &[ByteCodes::MOVE_INTO_REG_FROM_CONST as Byte, 8, r1], &5u64.to_le_bytes(),
+            &[nop, nop],
+            &[ByteCodes::INC_REG as Byte, r1],
+            &[nop],
+            &[ByteCodes::COMPARE_REG_CONST as Byte, 8, r1], &6u64.to_le_bytes(),
+            &[nop],
+            &[ByteCodes::JUMP_ZERO as Byte], &TARGET.to_le_bytes(),
+            // Skipped by the jump
+            &[nop],
+            // Second block
+            &[nop],
+            &[ByteCodes::DEC_REG as Byte, r1],
+            &[nop],
+        ].concat();
+        assert_eq!(code[TARGET], nop);
+
+        let mut stepped = test_processor(&code);
+        step(&mut stepped, code.len());
+
+        let mut decoded = test_processor(&code);
+
+        // The no-ops are elided, and the compare is fused with the jump across the no-op between them
+        let block = run_block(&mut decoded, code.len());
+        assert_eq!(block.len(), 3);
+        assert!(!block.iter().any(|instruction| matches!(instruction.operation, DecodedOperation::NoOperation)));
+        assert_eq!(decoded.registers.get(Registers::R1), 6);
+        assert_eq!(decoded.registers.pc(), TARGET);
+
+        // A trailing no-op has no following instruction to move the pc past it, so it's kept
+        let block = run_block(&mut decoded, code.len());
+        assert_eq!(block.len(), 2);
+        assert!(matches!(block[1].operation, DecodedOperation::NoOperation));
+        assert_eq!(decoded.registers.get(Registers::R1), 5);
+        assert_eq!(decoded.registers.pc(), code.len());
+
+        assert!(decoded.registers.iter().eq(stepped.registers.iter()));
+
+        // A block made of a single no-op
+        decoded.jump_to(code.len() - 1);
+        let block = run_block(&mut decoded, code.len());
+        assert_eq!(block.len(), 1);
+        assert_eq!(decoded.registers.pc(), code.len());
+    }
+
+
+    #[test]
+    fn test_fused_memory_copies() {
+        const D: Address = DATA_ADDRESS;
+
+        // Sequences of contiguous copies as (size, destination, source), with the number of copies left after fusing them
+        let cases: [(&[(Byte, Address, Address)], usize); 5] = [
+            (&[(8, D + 32, D), (8, D + 40, D + 8)], 1),
+            // The destination overlaps the end of the source
+            (&[(8, D + 4, D), (8, D + 12, D + 8)], 2),
+            // The destination overlaps the start of the source
+            (&[(8, D, D + 4), (8, D + 8, D + 12)], 2),
+            (&[(4, D + 32, D), (4, D + 36, D + 4), (4, D + 40, D + 8)], 1),
+            // The first two copies don't overlap, but the third one reads what they wrote
+            (&[(4, D + 8, D), (4, D + 12, D + 4), (4, D + 16, D + 8)], 2),
+        ];
+
+        for (copies, fused_len) in cases {
+            let code = copies.iter().flat_map(|&(size, dest, src)| memory_copy(size, dest, src)).collect::<Vec<Byte>>();
+
+            let mut stepped = test_processor(&code);
+            step(&mut stepped, code.len());
+
+            let mut decoded = test_processor(&code);
+            let block = run_block(&mut decoded, code.len());
+
+            assert_eq!(block.len(), fused_len, "{:?}", copies);
+            assert_eq!(decoded.memory.get_raw(), stepped.memory.get_raw(), "{:?}", copies);
+            assert_eq!(decoded.registers.pc(), code.len(), "{:?}", copies);
+        }
+    }
+
+}
@@ -2,6 +2,21 @@ use rusty_vm_lib::registers::{REGISTER_COUNT, RegisterContentType, Registers};
 use rusty_vm_lib::vm::{ErrorCodes, Address};
 
 
+/// Number of arithmetical flag registers, from `ZERO_FLAG` to `OVERFLOW_FLAG`
+pub const ARITHMETICAL_FLAGS_COUNT: usize = {
+    // The flags are written as a single block in the order zf, sf, rf, cf, of, so each one must be declared at its position
+    let zf = Registers::ZERO_FLAG as usize;
+    assert!(Registers::SIGN_FLAG as usize == zf + 1);
+    assert!(Registers::REMAINDER_FLAG as usize == zf + 2);
+    assert!(Registers::CARRY_FLAG as usize == zf + 3);
+    assert!(Registers::OVERFLOW_FLAG as usize == zf + 4);
+    Registers::OVERFLOW_FLAG as usize - zf + 1
+};
+
+
+/// The register file is a flat array of register-sized integers.
+/// It's aligned to a cache line so that it spans as few lines as possible.
+#[repr(align(64))]
 pub struct CPURegisters([RegisterContentType; REGISTER_COUNT]);
 
 
@@ -33,6 +48,14 @@ impl CPURegisters {
     }
 
 
+    /// Set all the arithmetical flags with a single contiguous store.
+    /// The flags are, in order: zf, sf, rf, cf, of
+    #[inline(always)]
+    pub fn set_arithmetical_flags(&mut self, flags: [u64; ARITHMETICAL_FLAGS_COUNT]) {
+        self.0[Registers::ZERO_FLAG as usize .. Registers::ZERO_FLAG as usize + ARITHMETICAL_FLAGS_COUNT].copy_from_slice(&flags);
+    }
+
+
     /// Increment the program counter by the given offset.
     #[inline(always)]
     pub fn inc_pc(&mut self, offset: usize) {